@@ -0,0 +1,69 @@
+"""Initial schema: users, availabilities and appointments
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+Databases previously created by ``Base.metadata.create_all`` already have these
+tables; mark them with ``alembic stamp 0001`` before upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("role", sa.Enum("DOCTOR", "PATIENT", name="userrole"), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "availabilities",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("doctor_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("is_available", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_availabilities_id", "availabilities", ["id"])
+
+    op.create_table(
+        "appointments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("doctor_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("availability_id", sa.Integer(), sa.ForeignKey("availabilities.id"), nullable=False),
+        sa.Column("appointment_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_appointments_id", "appointments", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_appointments_id", table_name="appointments")
+    op.drop_table("appointments")
+    op.drop_index("ix_availabilities_id", table_name="availabilities")
+    op.drop_table("availabilities")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
+    sa.Enum(name="userrole").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,37 @@
+"""At most one scheduled appointment per availability
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_appointments_availability_scheduled",
+            "appointments",
+            ["availability_id"],
+            unique=True,
+            postgresql_where=sa.text("status = 'scheduled'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "uq_appointments_availability_scheduled",
+            table_name="appointments",
+            postgresql_concurrently=True,
+        )
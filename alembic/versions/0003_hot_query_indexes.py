@@ -0,0 +1,56 @@
+"""Partial composite indexes for the appointment and availability hot queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:20:00
+
+- appointments by patient / doctor: ``<id> = ? AND status = 'scheduled' ORDER BY appointment_time``
+- open availabilities by doctor, including the overlap check on
+  ``start_time < ? AND end_time > ?``
+
+Built concurrently so large tables stay writable during the migration.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_appointments_patient_scheduled_time",
+            "appointments",
+            ["patient_id", "appointment_time"],
+            postgresql_where=sa.text("status = 'scheduled'"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_appointments_doctor_scheduled_time",
+            "appointments",
+            ["doctor_id", "appointment_time"],
+            postgresql_where=sa.text("status = 'scheduled'"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_availabilities_doctor_open_start",
+            "availabilities",
+            ["doctor_id", "start_time", "end_time"],
+            postgresql_where=sa.text("is_available"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table in (
+            ("ix_availabilities_doctor_open_start", "availabilities"),
+            ("ix_appointments_doctor_scheduled_time", "appointments"),
+            ("ix_appointments_patient_scheduled_time", "appointments"),
+        ):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,36 @@
+"""Partial index on open availabilities by start time, across doctors
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 14:05:00
+
+Serves the next-available search: ``is_available ORDER BY start_time, id LIMIT k``
+reads the first k index entries at or after ``from`` whatever the number of doctors.
+
+Built concurrently so large tables stay writable during the migration.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_availabilities_open_start",
+            "availabilities",
+            ["start_time", "id"],
+            postgresql_where=sa.text("is_available"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_availabilities_open_start", table_name="availabilities", postgresql_concurrently=True)
@@ -0,0 +1,59 @@
+"""Appointments carry an end time; overlap is enforced by an exclusion constraint
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 15:30:00
+
+Existing appointments took their whole availability window, so ``end_time`` is
+backfilled with the window end. The one-scheduled-appointment-per-availability
+index is replaced by ``ex_appointments_doctor_scheduled_overlap``: a doctor's
+scheduled ``[appointment_time, end_time)`` ranges may not overlap. The integer
+equality in the constraint needs the ``btree_gist`` extension.
+
+Adding the constraint builds its index under an exclusive lock on ``appointments``
+and fails if existing scheduled appointments of a doctor already overlap.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.add_column("appointments", sa.Column("end_time", sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        """
+        UPDATE appointments AS ap
+        SET end_time = GREATEST(av.end_time, ap.appointment_time)
+        FROM availabilities AS av
+        WHERE av.id = ap.availability_id
+        """
+    )
+    op.alter_column("appointments", "end_time", nullable=False)
+    op.drop_index("uq_appointments_availability_scheduled", table_name="appointments")
+    op.create_exclude_constraint(
+        "ex_appointments_doctor_scheduled_overlap",
+        "appointments",
+        ("doctor_id", "="),
+        (sa.text("tstzrange(appointment_time, end_time)"), "&&"),
+        using="gist",
+        where=sa.text("status = 'scheduled'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("ex_appointments_doctor_scheduled_overlap", "appointments", type_="exclude")
+    op.create_index(
+        "uq_appointments_availability_scheduled",
+        "appointments",
+        ["availability_id"],
+        unique=True,
+        postgresql_where=sa.text("status = 'scheduled'"),
+    )
+    op.drop_column("appointments", "end_time")
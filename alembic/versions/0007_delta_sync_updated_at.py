@@ -0,0 +1,46 @@
+"""Always-set updated_at and change-order indexes for delta sync
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 19:30:00
+
+``updated_at`` was only set by updates, so new rows had NULL. Existing NULLs are
+backfilled from ``created_at`` and the column now defaults to ``now()``. The
+``(owner, updated_at, id)`` indexes let a changes-since query seek straight to its
+cursor, so polling costs O(changes) rather than O(history). They are built
+concurrently so large tables stay writable during the migration.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_availabilities_doctor_updated", "availabilities", ["doctor_id", "updated_at", "id"]),
+    ("ix_appointments_patient_updated", "appointments", ["patient_id", "updated_at", "id"]),
+    ("ix_appointments_doctor_updated", "appointments", ["doctor_id", "updated_at", "id"]),
+]
+
+
+def upgrade() -> None:
+    for table in ("availabilities", "appointments"):
+        op.execute(f"UPDATE {table} SET updated_at = COALESCE(created_at, now()) WHERE updated_at IS NULL")
+        op.alter_column(table, "updated_at", server_default=sa.func.now(), nullable=False)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+    for table in ("availabilities", "appointments"):
+        op.alter_column(table, "updated_at", server_default=None, nullable=True)
@@ -0,0 +1,40 @@
+"""Shared Idempotency-Key store
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 10:00:00
+
+Claims and stored responses for ``Idempotency-Key`` requests move from each
+worker's memory to this table, so a retry reaching a different worker process is
+still deduplicated. The key is the primary key; ``INSERT ... ON CONFLICT DO
+NOTHING`` decides which request owns it.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("fingerprint", sa.String(64), nullable=False),
+        sa.Column("status_code", sa.Integer()),
+        sa.Column("headers", postgresql.JSONB()),
+        sa.Column("body", sa.LargeBinary()),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_idempotency_keys_expires_at", table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
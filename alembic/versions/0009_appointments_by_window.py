@@ -0,0 +1,39 @@
+"""Index scheduled appointments by availability window
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 12:00:00
+
+Listings, the next-available search and slot events report each window's free
+ranges, read from its scheduled appointments; closing a fully booked window sums
+them too. Without an index on ``availability_id`` (the unique one was dropped in
+0005) every such lookup scans the appointments table. ``end_time`` is included
+so the lookup is index-only. Built concurrently so bookings continue meanwhile.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_appointments_availability_scheduled",
+            "appointments",
+            ["availability_id", "appointment_time", "end_time"],
+            postgresql_where=sa.text("status = 'scheduled'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_appointments_availability_scheduled", table_name="appointments", postgresql_concurrently=True
+        )
@@ -0,0 +1,36 @@
+"""Index finished outbox jobs by completion time
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 14:00:00
+
+The job queue deletes ``done`` jobs once they are older than the retention
+period. This partial index lets each purge batch read the oldest finished jobs
+directly instead of scanning the whole table. Built concurrently so jobs keep
+being written meanwhile.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_outbox_jobs_done_updated",
+            "outbox_jobs",
+            ["updated_at", "id"],
+            postgresql_where=sa.text("status = 'done'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_outbox_jobs_done_updated", table_name="outbox_jobs", postgresql_concurrently=True)
@@ -0,0 +1,159 @@
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.config import settings
+from app.pagination import PageRequest
+
+
+@dataclass(frozen=True)
+class AvailabilitySlot:
+    """Read-only snapshot of an Availability row and the parts of it that are still free."""
+    id: int
+    doctor_id: int
+    start_time: datetime
+    end_time: datetime
+    is_available: bool = True
+    free_ranges: Tuple[dict, ...] = ()
+    updated_at: Optional[datetime] = None
+
+
+def free_ranges(
+    start: datetime, end: datetime, booked: Iterable[Tuple[datetime, datetime]]
+) -> Tuple[dict, ...]:
+    """The gaps in ``[start, end)`` left by the ``booked`` ranges, as ``TimeRange`` dicts in time order."""
+    gaps = []
+    cursor = start
+    for booked_start, booked_end in sorted(booked):
+        if booked_start > cursor:
+            gaps.append({"start_time": cursor, "end_time": min(booked_start, end)})
+        cursor = max(cursor, booked_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append({"start_time": cursor, "end_time": end})
+    return tuple(gaps)
+
+
+def snapshot(window, booked_starts=None, booked_ends=None, updated_at=None) -> AvailabilitySlot:
+    """An ``AvailabilitySlot`` for a window row given its scheduled appointments' starts and ends.
+
+    A closed window has no free ranges, even if it is not fully booked.
+    """
+    gaps = ()
+    if window.is_available:
+        gaps = free_ranges(window.start_time, window.end_time, zip(booked_starts or (), booked_ends or ()))
+    return AvailabilitySlot(
+        window.id, window.doctor_id, window.start_time, window.end_time, window.is_available, gaps, updated_at
+    )
+
+
+def clip_free_ranges(slot: AvailabilitySlot, start: Optional[datetime]) -> AvailabilitySlot:
+    """``slot`` with only the parts of its free ranges at or after ``start``."""
+    if start is None:
+        return slot
+    gaps = tuple(
+        {"start_time": max(gap["start_time"], start), "end_time": gap["end_time"]}
+        for gap in slot.free_ranges
+        if gap["end_time"] > start
+    )
+    return replace(slot, free_ranges=gaps)
+
+
+class DoctorIntervals:
+    """One doctor's open windows, sorted by ``(start_time, id)``.
+
+    ``max_end[i]`` is the latest end time among the first ``i + 1`` windows, so an
+    overlap check is a single bisection even if stored windows overlap each other.
+    """
+
+    def __init__(self, slots: Sequence[AvailabilitySlot]):
+        self.slots = sorted(slots, key=lambda slot: (slot.start_time, slot.id))
+        self.keys = [(slot.start_time, slot.id) for slot in self.slots]
+        self.starts = [slot.start_time for slot in self.slots]
+        self.max_end: List[datetime] = []
+        for slot in self.slots:
+            self.max_end.append(slot.end_time if not self.max_end else max(self.max_end[-1], slot.end_time))
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        # Windows [0, last] start before ``end``; one of them overlaps iff it also ends after ``start``
+        last = bisect_left(self.starts, end) - 1
+        return last >= 0 and self.max_end[last] > start
+
+    def page(self, page: Optional[PageRequest]) -> List[AvailabilitySlot]:
+        if page is None:
+            return list(self.slots)
+        low = 0 if page.start is None else bisect_left(self.starts, page.start)
+        if page.after is not None:
+            low = max(low, bisect_right(self.keys, tuple(page.after)))
+        high = len(self.slots) if page.end is None else bisect_left(self.starts, page.end)
+        return self.slots[low:min(high, low + page.limit)]
+
+
+class AvailabilityIndex:
+    """Size-bounded, lazily loaded per-doctor interval index of open availability.
+
+    Repositories call ``invalidate`` after every committed write that touches a
+    doctor's availability. A load that races with an invalidation is returned to its
+    caller but not stored, so stale windows never enter the index. The total number
+    of cached windows is capped at ``max_slots``; least recently used doctors are
+    evicted first. ``on_invalidate``, when set, is called with each invalidated
+    doctor id so other worker processes can drop their copy too.
+    """
+
+    def __init__(self, enabled: bool, max_slots: int):
+        self.enabled = enabled
+        self.max_slots = max_slots
+        self._entries: "OrderedDict[int, DoctorIntervals]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._size = 0
+        self._epoch = 0
+        self.on_invalidate: Optional[Callable[[int], None]] = None
+
+    async def get(
+        self, doctor_id: int, loader: Callable[[], Awaitable[Sequence[AvailabilitySlot]]]
+    ) -> DoctorIntervals:
+        intervals = self._entries.get(doctor_id)
+        if intervals is not None:
+            self._entries.move_to_end(doctor_id)
+            return intervals
+
+        generation = (self._epoch, self._generations.get(doctor_id, 0))
+        intervals = DoctorIntervals(await loader())
+        if (self._epoch, self._generations.get(doctor_id, 0)) == generation and doctor_id not in self._entries:
+            self._store(doctor_id, intervals)
+        return intervals
+
+    def invalidate(self, doctor_id: int, broadcast: bool = True) -> None:
+        self._generations[doctor_id] = self._generations.get(doctor_id, 0) + 1
+        intervals = self._entries.pop(doctor_id, None)
+        if intervals is not None:
+            self._size -= len(intervals)
+        if broadcast and self.enabled and self.on_invalidate is not None:
+            self.on_invalidate(doctor_id)
+
+    def clear(self) -> None:
+        """Drops every cached doctor in this process only."""
+        # Loads that started before the clear must not be stored either
+        self._epoch += 1
+        for doctor_id in list(self._entries):
+            self.invalidate(doctor_id, broadcast=False)
+
+    def _store(self, doctor_id: int, intervals: DoctorIntervals) -> None:
+        if len(intervals) > self.max_slots:
+            return
+        self._entries[doctor_id] = intervals
+        self._size += len(intervals)
+        while self._size > self.max_slots:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+availability_index = AvailabilityIndex(
+    enabled=settings.availability_index_enabled,
+    max_slots=settings.availability_index_max_slots,
+)
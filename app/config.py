@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -8,10 +8,97 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
 
+    # Database engine and connection pool (per worker process)
+    db_echo: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_pre_ping: bool = False
+    db_pool_recycle: int = -1
+    db_statement_cache_size: int = 100
+    # Refuse to start unless the database is at the expected Alembic revision
+    db_schema_check: bool = True
+
+    # Optional read replica for read-only repository queries; after failing to
+    # connect, it is skipped for replica_retry_seconds
+    replica_database_url: Optional[str] = None
+    replica_retry_seconds: float = 30.0
+
+    # Password hashing executor (0 workers hashes inline on the event loop)
+    password_hash_executor: Literal["thread", "process"] = "thread"
+    password_hash_workers: int = 4
+    password_hash_queue_limit: int = 64
+
+    # Admission control for /auth/register and /auth/login (a rate of 0 disables
+    # that bucket, 0 concurrency removes the limit)
+    auth_max_concurrent: int = 8
+    auth_max_queue: int = 32
+    auth_queue_timeout: float = 2.0
+    auth_global_rate: float = 50.0
+    auth_global_burst: int = 100
+    auth_client_rate: float = 1.0
+    auth_client_burst: int = 10
+    auth_max_clients: int = 10000
+
+    # Background jobs (emails and other side effects) drained from the outbox_jobs
+    # table by each worker process; a rate of 0 removes the throttle
+    job_queue_enabled: bool = True
+    job_queue_workers: int = 2
+    job_queue_batch_size: int = 20
+    job_queue_poll_interval: float = 1.0
+    job_queue_max_attempts: int = 5
+    job_queue_backoff_base: float = 2.0
+    job_queue_backoff_max: float = 300.0
+    job_queue_lease_seconds: float = 60.0
+    job_queue_rate: float = 0.0
+    job_queue_retention_seconds: float = 604800.0
+
+    # Responses to write requests sent with an Idempotency-Key, kept in the
+    # idempotency_keys table for idempotency_ttl_seconds; duplicates arriving while
+    # the first request runs poll for it for up to idempotency_wait_timeout. A claim
+    # whose owner died is given up after idempotency_lease_seconds
+    idempotency_enabled: bool = True
+    idempotency_ttl_seconds: float = 86400.0
+    idempotency_lease_seconds: float = 60.0
+    idempotency_wait_timeout: float = 30.0
+    idempotency_poll_interval: float = 0.05
+    idempotency_max_body_bytes: int = 1048576
+
+    # Cross-worker cache invalidation: "postgres" relays invalidations of the
+    # availability index and doctor directory to the other workers with
+    # LISTEN/NOTIFY on one extra connection per worker; "local" keeps them in-process
+    invalidation_bus: Literal["local", "postgres"] = "postgres"
+    invalidation_channel: str = "cache_invalidation"
+    invalidation_queue_limit: int = 10000
+    invalidation_keepalive_seconds: float = 5.0
+
+    # Delta-sync (changes-since) endpoints hold back rows changed in the last
+    # delta_sync_settle_seconds so transactions still committing are not skipped
+    delta_sync_settle_seconds: float = 2.0
+
+    # Server-Sent Events streams of availability changes, per worker: frames a
+    # slow watcher may fall behind before it is told to resync, and streams served
+    slot_events_queue_size: int = 100
+    slot_events_max_subscribers: int = 10000
+    slot_events_heartbeat_seconds: float = 15.0
+
+    # Verified JWTs kept in memory until they expire (0 disables the cache)
+    token_cache_size: int = 10000
+
+    # In-process per-doctor index of open availability windows
+    availability_index_enabled: bool = False
+    availability_index_max_slots: int = 200000
+
+    # Serialized GET /doctors pages kept in memory (0 disables the cache)
+    doctor_directory_cache_size: int = 256
+
+    # Encode list responses straight from ORM rows with orjson (if installed),
+    # skipping response_model re-validation
+    fast_json_responses: bool = False
+
     class Config:
         env_file = ".env"
         case_sensitive = False
 
 
 settings = Settings()
-
@@ -1,16 +1,136 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+import logging
+import time
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, ProgrammingError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.expression import Executable
 from app.config import settings
+from app.middleware.metrics_middleware import record_query
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=True,
-    future=True,
+logger = logging.getLogger(__name__)
+
+# The migrations shipped with this code; the database must be at their head or newer
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "alembic"
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+
+def _database_url(database_url: str):
+    url = make_url(database_url)
+    if url.get_driver_name() == "asyncpg" and "prepared_statement_cache_size" not in url.query:
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.db_statement_cache_size)})
+    return url
+
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    record_query(time.perf_counter() - context._query_started)
+
+
+def _create_engine(database_url: str) -> AsyncEngine:
+    new_engine = create_async_engine(
+        _database_url(database_url),
+        echo=settings.db_echo,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    event.listen(new_engine.sync_engine, "before_cursor_execute", _start_query_timer)
+    event.listen(new_engine.sync_engine, "after_cursor_execute", _stop_query_timer)
+    return new_engine
+
+
+engine = _create_engine(settings.database_url)
+replica_engine: Optional[AsyncEngine] = (
+    _create_engine(settings.replica_database_url) if settings.replica_database_url else None
 )
 
+# Execution option marking a statement as safe to run on the replica
+READ_ONLY = "read_only"
+# Session.info flag set once a session has written; it then reads from the primary only
+_PINNED_TO_PRIMARY = "pinned_to_primary"
+
+
+class ReplicaHealth:
+    """Skips the replica for ``retry_after`` seconds after it fails to hand out a connection."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        self.down_until = 0.0
+        self.fallbacks = 0
+
+    @property
+    def available(self) -> bool:
+        return replica_engine is not None and time.monotonic() >= self.down_until
+
+    def mark_down(self) -> None:
+        self.down_until = time.monotonic() + self.retry_after
+        self.fallbacks += 1
+
+
+replica_health = ReplicaHealth(retry_after=settings.replica_retry_seconds)
+
+
+class RoutingSession(Session):
+    """Session sending statements marked ``READ_ONLY`` to the replica engine, if configured.
+
+    Once the session flushes or runs an INSERT/UPDATE/DELETE, every later statement goes
+    to the primary, so a request always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.info[_PINNED_TO_PRIMARY] = True
+        elif (
+            isinstance(clause, Executable)
+            and clause.get_execution_options().get(READ_ONLY)
+            and self.reads_from_replica()
+        ):
+            return replica_engine.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def reads_from_replica(self) -> bool:
+        return replica_health.available and not self.info.get(_PINNED_TO_PRIMARY)
+
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
@@ -19,10 +139,108 @@ AsyncSessionLocal = async_sessionmaker(
 Base = declarative_base()
 
 
+async def prefer_replica(session: AsyncSession) -> None:
+    """Makes sure the replica can serve this session's next read-only statement.
+
+    If no replica connection can be obtained, the replica is marked down and the
+    statement falls back to the primary.
+    """
+    sync_session = session.sync_session
+    if not isinstance(sync_session, RoutingSession) or not sync_session.reads_from_replica():
+        return
+    try:
+        await session.connection(bind_arguments={"bind": replica_engine.sync_engine})
+    except (DBAPIError, OSError, PoolTimeoutError) as e:
+        logger.warning("Read replica unavailable, reading from the primary for %ss: %s",
+                       replica_health.retry_after, e)
+        replica_health.mark_down()
+
+
+async def execute_read(session: AsyncSession, statement):
+    """Executes a read-only statement on the replica when possible, otherwise on the primary."""
+    await prefer_replica(session)
+    return await session.execute(statement.execution_options(**{READ_ONLY: True}))
+
+
+def get_pool_stats(pool_engine: AsyncEngine = engine) -> dict:
+    """Live connection pool statistics for monitoring."""
+    pool = pool_engine.sync_engine.pool
+    stats = {
+        "pool_size": pool.size(),
+        "max_overflow": settings.db_max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update({
+            "checkouts": pool.checkouts,
+            "checkout_timeouts": pool.timeouts,
+            "wait_time_total_seconds": round(pool.wait_time_total, 6),
+            "wait_time_max_seconds": round(pool.wait_time_max, 6),
+            "wait_time_avg_seconds": round(pool.wait_time_total / pool.checkouts, 6) if pool.checkouts else 0.0,
+        })
+    return stats
+
+
+def get_replica_stats() -> dict:
+    """Replica routing state plus the replica pool statistics, if one is configured."""
+    if replica_engine is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "available": replica_health.available,
+        "fallbacks": replica_health.fallbacks,
+        **get_pool_stats(replica_engine),
+    }
+
+
+def _migration_scripts():
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return ScriptDirectory.from_config(config)
+
+
+def expected_schema_revision() -> str:
+    """The Alembic head of the migrations shipped with this code."""
+    return _migration_scripts().get_current_head()
+
+
+async def check_schema_version() -> None:
+    """Fails fast unless the database has been migrated to this code's Alembic head or past it.
+
+    A single primary-key read of ``alembic_version``, run once per worker at startup.
+    A revision this code does not know, numbered after its head, comes from a newer
+    release whose migrations already ran (e.g. mid rolling deploy) and is accepted;
+    migrations must stay backwards compatible for that to be safe.
+    """
+    try:
+        async with engine.connect() as conn:
+            revision = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar_one_or_none()
+    except ProgrammingError:
+        revision = None  # no alembic_version table: never migrated
+
+    scripts = _migration_scripts()
+    head = scripts.get_current_head()
+    if revision == head:
+        return
+    known = {script.revision for script in scripts.walk_revisions()}
+    # Revision ids are zero-padded sequence numbers, so string order is migration order
+    if revision is not None and revision not in known and revision > head:
+        logger.info("Database schema is at revision %s, ahead of this code's head %s", revision, head)
+        return
+    raise RuntimeError(
+        f"Database schema is at revision {revision or 'none'}, expected {head} or later; "
+        "run `alembic upgrade head`"
+    )
+
+
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
             await session.close()
-
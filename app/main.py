@@ -1,6 +1,13 @@
 from fastapi import FastAPI
-from app.routers import auth, doctors, appointments
-from app.database import engine, Base
+from app.routers import auth, doctors, appointments, monitoring
+from app.config import settings
+from app.database import check_schema_version
+from app.services.password_hasher import password_hasher
+from app.services.job_queue import job_queue
+from app.services.invalidation_bus import invalidation_bus
+from app.services import notifications  # noqa: F401  (registers the job handlers)
+from app.middleware.idempotency_middleware import IdempotencyMiddleware
+from app.middleware.metrics_middleware import MetricsMiddleware
 
 app = FastAPI(
     title="Doctor Appointment API",
@@ -8,17 +15,32 @@ app = FastAPI(
     version="1.0.0"
 )
 
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(doctors.router)
 app.include_router(appointments.router)
+app.include_router(monitoring.router)
 
 
 @app.on_event("startup")
 async def startup():
-   
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # The schema is owned by Alembic migrations; only confirm it is current
+    if settings.db_schema_check:
+        await check_schema_version()
+    if settings.invalidation_bus == "postgres":
+        invalidation_bus.start()
+    if settings.job_queue_enabled:
+        job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_queue.stop()
+    await invalidation_bus.stop()
+    password_hasher.shutdown()
 
 
 @app.get("/")
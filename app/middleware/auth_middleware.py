@@ -1,7 +1,5 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
 from app.services.auth_service import AuthService
 from app.models import UserRole
 from typing import Optional
@@ -10,12 +8,10 @@ security = HTTPBearer()
 
 
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
-    token = credentials.credentials
-    auth_service = AuthService(db)
-    token_data = auth_service.verify_token(token)
+    # Token verification is stateless; don't open a database session for it
+    token_data = AuthService.verify_token(credentials.credentials)
     
     if token_data is None or token_data.user_id is None or token_data.role is None:
         raise HTTPException(
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+from typing import Optional
+from app.config import settings
+from app.services.auth_service import AuthService
+from app.services.idempotency_store import IdempotencyConflict, StoredResponse, idempotency_store
+
+IDEMPOTENT_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = b"idempotent-replayed"
+# Responses carrying credentials (e.g. /auth/login) are never stored, so they cannot be replayed
+TOKEN_FIELD = b'"access_token"'
+
+logger = logging.getLogger(__name__)
+
+
+def _header(scope, name: bytes) -> bytes:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return b""
+
+
+def _caller(scope) -> Optional[bytes]:
+    """The signed-in user's ID, the client address for anonymous requests, or None if neither is usable.
+
+    Keys are scoped by user rather than by token so a retry after a token refresh
+    still replays. Anonymous keys are scoped by client address so one client cannot
+    replay another's response.
+    """
+    authorization = _header(scope, b"authorization").decode("latin-1")
+    if not authorization:
+        client = scope.get("client")
+        return f"anonymous {client[0]}".encode() if client else None
+    scheme, _, token = authorization.partition(" ")
+    token_data = AuthService.verify_token(token.strip()) if scheme.lower() == "bearer" else None
+    if token_data is None or token_data.user_id is None:
+        return None
+    return str(token_data.user_id).encode()
+
+
+def _digest(*parts: bytes) -> str:
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(len(part).to_bytes(8, "big"))
+        sha.update(part)
+    return sha.hexdigest()
+
+
+async def _send_error(send, status_code: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware honouring the ``Idempotency-Key`` header on write requests.
+
+    A retried request with the same key, caller (user ID, or client address when
+    anonymous), method and path gets the first response back, marked
+    ``Idempotent-Replayed: true``, without running again; a duplicate arriving on
+    any worker while the first is still running waits for it. Server errors, 429s
+    and responses carrying an access token are not stored, so retrying them runs
+    the request again. Requests without the header, or with a token that does not
+    verify (they are rejected by the route anyway), are passed straight through.
+    """
+
+    def __init__(self, app, store=idempotency_store):
+        self.app = app
+        self.store = store
+        # Larger responses are passed through without being stored
+        self.max_body_bytes = settings.idempotency_max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS or not self.store.enabled:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = _header(scope, b"idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_error(send, 400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+            return
+        caller = _caller(scope)
+        if caller is None:
+            await self.app(scope, receive, send)
+            return
+
+        # The request body is part of the fingerprint, so it is read up front and replayed to the app
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return  # client disconnected
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        method, path = scope["method"].encode(), scope["path"].encode()
+        key = _digest(caller, method, path, idempotency_key)
+        fingerprint = _digest(method, path, scope.get("query_string", b""), body)
+        try:
+            stored = await self.store.acquire(key, fingerprint)
+        except IdempotencyConflict as e:
+            await _send_error(send, e.status_code, e.detail)
+            return
+        if stored is not None:
+            await send({
+                "type": "http.response.start",
+                "status": stored.status,
+                "headers": stored.headers + [(REPLAYED_HEADER, b"true")],
+            })
+            await send({"type": "http.response.body", "body": stored.body})
+            return
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        headers = []
+        response_chunks = []
+        size = 0
+
+        async def capture_send(message):
+            nonlocal status_code, headers, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body" and size <= self.max_body_bytes:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                response_chunks.append(chunk)
+            await send(message)
+
+        stored_response = None
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            response_body = b"".join(response_chunks)
+            if (
+                status_code < 500 and status_code != 429
+                and size <= self.max_body_bytes
+                and TOKEN_FIELD not in response_body
+            ):
+                stored_response = StoredResponse(status_code, headers, response_body)
+        finally:
+            # The response has been sent; if recording the outcome fails the claim expires after its lease
+            try:
+                if stored_response is not None:
+                    await self.store.complete(key, stored_response)
+                else:
+                    await self.store.release(key)
+            except Exception:
+                logger.exception("Recording the outcome of an Idempotency-Key request failed")
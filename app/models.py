@@ -1,4 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Boolean
+from sqlalchemy import (
+    Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum, Boolean, Index, DDL, event, text,
+    LargeBinary
+)
+from sqlalchemy.dialects.postgresql import JSONB, ExcludeConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -36,7 +40,27 @@ class Availability(Base):
     end_time = Column(DateTime(timezone=True), nullable=False)
     is_available = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        # A doctor's windows in change order: delta sync
+        Index("ix_availabilities_doctor_updated", "doctor_id", "updated_at", "id"),
+        # Open windows per doctor: listing and the overlap check
+        Index(
+            "ix_availabilities_doctor_open_start",
+            "doctor_id",
+            "start_time",
+            "end_time",
+            postgresql_where=text("is_available"),
+        ),
+        # Open windows across all doctors in start order: next-available search
+        Index(
+            "ix_availabilities_open_start",
+            "start_time",
+            "id",
+            postgresql_where=text("is_available"),
+        ),
+    )
 
     # Relationships
     doctor = relationship("User", back_populates="availabilities")
@@ -51,12 +75,94 @@ class Appointment(Base):
     patient_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     availability_id = Column(Integer, ForeignKey("availabilities.id"), nullable=False)
     appointment_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
     status = Column(String, default="scheduled", nullable=False)  # scheduled, cancelled, completed
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        # A doctor's scheduled appointments never overlap (needs the btree_gist extension)
+        ExcludeConstraint(
+            (doctor_id, "="),
+            (func.tstzrange(appointment_time, end_time), "&&"),
+            name="ex_appointments_doctor_scheduled_overlap",
+            using="gist",
+            where=text("status = 'scheduled'"),
+        ),
+        # Scheduled appointments per patient / doctor in time order
+        Index(
+            "ix_appointments_patient_scheduled_time",
+            "patient_id",
+            "appointment_time",
+            postgresql_where=text("status = 'scheduled'"),
+        ),
+        Index(
+            "ix_appointments_doctor_scheduled_time",
+            "doctor_id",
+            "appointment_time",
+            postgresql_where=text("status = 'scheduled'"),
+        ),
+        # Every appointment per patient / doctor in change order: delta sync
+        Index("ix_appointments_patient_updated", "patient_id", "updated_at", "id"),
+        Index("ix_appointments_doctor_updated", "doctor_id", "updated_at", "id"),
+        # Scheduled appointments per window in time order: free ranges and window capacity
+        Index(
+            "ix_appointments_availability_scheduled",
+            "availability_id",
+            "appointment_time",
+            "end_time",
+            postgresql_where=text("status = 'scheduled'"),
+        ),
+    )
 
     # Relationships
     doctor = relationship("User", foreign_keys=[doctor_id], back_populates="appointments_as_doctor")
     patient = relationship("User", foreign_keys=[patient_id], back_populates="appointments_as_patient")
     availability = relationship("Availability", back_populates="appointments")
 
+
+event.listen(
+    Appointment.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+
+
+class OutboxJob(Base):
+    """A side effect (e.g. an email) written in the same transaction as the change causing it."""
+    __tablename__ = "outbox_jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    run_after = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Due jobs in order: the dispatcher's claim query
+        Index("ix_outbox_jobs_pending_run_after", "run_after", "id", postgresql_where=text("status = 'pending'")),
+        # Finished jobs by age: the retention purge
+        Index("ix_outbox_jobs_done_updated", "updated_at", "id", postgresql_where=text("status = 'done'")),
+    )
+
+
+class IdempotencyKey(Base):
+    """The claim on, then the stored response to, a write request sent with an ``Idempotency-Key``."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)  # sha256 of caller, method, path and header value
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer)  # NULL while the owning request is still running
+    headers = Column(JSONB)
+    body = Column(LargeBinary)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Expired claims and responses in order: the periodic purge
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
@@ -0,0 +1,157 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Sequence, Tuple
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import Select, func, tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encodes a keyset position as an opaque, URL-safe string."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keyed_by_time: bool) -> tuple:
+    """Decodes a cursor into ``(datetime, id)`` or ``(id,)``; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    if keyed_by_time:
+        if len(values) != 2 or not isinstance(values[0], str) or not isinstance(values[1], int):
+            raise ValueError("Invalid cursor")
+        try:
+            return datetime.fromisoformat(values[0]), values[1]
+        except ValueError as e:
+            raise ValueError("Invalid cursor") from e
+    if len(values) != 1 or not isinstance(values[0], int):
+        raise ValueError("Invalid cursor")
+    return (values[0],)
+
+
+@dataclass
+class PageRequest:
+    """A keyset page: at most ``limit`` rows after ``after``, within ``[start, end)``."""
+    limit: int = DEFAULT_PAGE_SIZE
+    after: Optional[tuple] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+    def next_cursor(self, rows: Sequence[Any], key: Callable[[Any], tuple]) -> Optional[str]:
+        """Cursor for the following page, or None when this page was the last one."""
+        if len(rows) < self.limit:
+            return None
+        return encode_cursor(key(rows[-1]))
+
+    def set_next_cursor(self, response: Response, rows: Sequence[Any], key: Callable[[Any], tuple]) -> None:
+        cursor = self.next_cursor(rows, key)
+        if cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
+
+    def changes_cursor(self, rows: Sequence[Any]) -> Optional[str]:
+        """Delta-sync cursor to poll with next: after the last change, or unchanged if there were none."""
+        if rows:
+            return encode_cursor((rows[-1].updated_at, rows[-1].id))
+        return encode_cursor(self.after) if self.after is not None else None
+
+
+def apply_page(
+    query: Select, page: Optional[PageRequest], id_column, time_column=None, window_column=None
+) -> Select:
+    """Orders ``query`` by its keyset and applies the page's cursor, time window and limit.
+
+    The keyset is ``(time_column, id_column)``, or ``id_column`` alone when there is no
+    time column. The ``from``/``to`` window applies to ``window_column``, which defaults
+    to ``time_column``.
+    """
+    if window_column is None:
+        window_column = time_column
+    query = query.order_by(id_column) if time_column is None else query.order_by(time_column, id_column)
+    if page is None:
+        return query
+
+    if window_column is not None:
+        if page.start is not None:
+            query = query.where(window_column >= page.start)
+        if page.end is not None:
+            query = query.where(window_column < page.end)
+    if page.after is not None:
+        if time_column is None:
+            query = query.where(id_column > page.after[0])
+        else:
+            query = query.where(tuple_(time_column, id_column) > tuple_(*page.after))
+    return query.limit(page.limit)
+
+
+def apply_changes(query: Select, page: PageRequest, updated_column, id_column, settle_seconds: float) -> Select:
+    """Orders ``query`` by ``(updated_column, id_column)`` and returns the changes after the page's cursor.
+
+    ``updated_at`` is stamped with the writing transaction's start time, so a slow
+    transaction can commit a row that sorts before changes a client has already
+    seen. Rows changed within the last ``settle_seconds`` are held back until
+    every transaction that could still commit before them has done so.
+    """
+    query = query.where(updated_column <= func.now() - timedelta(seconds=settle_seconds))
+    if page.after is not None:
+        query = query.where(tuple_(updated_column, id_column) > tuple_(*page.after))
+    return query.order_by(updated_column, id_column).limit(page.limit)
+
+
+def changes_params():
+    """FastAPI dependency parsing ``limit`` and the delta-sync ``cursor``."""
+
+    def dependency(
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="Cursor from the previous response; omit for a full sync"),
+    ) -> PageRequest:
+        after: Optional[Tuple] = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor, keyed_by_time=True)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+        return PageRequest(limit=limit, after=after)
+
+    return dependency
+
+
+def page_params(keyed_by_time: bool = True):
+    """FastAPI dependency factory parsing ``limit``, ``cursor``, ``from`` and ``to``."""
+
+    def dependency(
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+        start: Optional[datetime] = Query(None, alias="from"),
+        end: Optional[datetime] = Query(None, alias="to"),
+    ) -> PageRequest:
+        after: Optional[Tuple] = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor, keyed_by_time)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+        if start is not None and end is not None and start >= end:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="'from' must be before 'to'"
+            )
+        return PageRequest(limit=limit, after=after, start=start, end=end)
+
+    return dependency
@@ -1,28 +1,205 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
-from typing import List, Optional
-from datetime import datetime
-from app.models import Appointment
+from sqlalchemy import select, insert, update, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import joinedload
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+from app.config import settings
+from app.database import READ_ONLY, execute_read, prefer_replica
+from app.models import Appointment, Availability
+from app.pagination import PageRequest, apply_changes, apply_page
+from app.repositories.outbox_repository import OutboxRepository
+from app.repositories.availability_repository import BOOKED_COLUMNS
+from app.availability_index import AvailabilitySlot, availability_index, snapshot
+from app.slot_events import slot_events
 
 
 class AppointmentRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create(
-        self, doctor_id: int, patient_id: int, availability_id: int, appointment_time: datetime
-    ) -> Appointment:
-        appointment = Appointment(
-            doctor_id=doctor_id,
-            patient_id=patient_id,
-            availability_id=availability_id,
-            appointment_time=appointment_time,
-            status="scheduled"
+    async def book(
+        self,
+        doctor_id: int,
+        patient_id: int,
+        availability_id: int,
+        appointment_time: datetime,
+        end_time: Optional[datetime] = None,
+        outbox_kind: Optional[str] = None,
+    ) -> Optional[Appointment]:
+        """Books ``[appointment_time, end_time)`` inside an open window in a single transaction.
+
+        ``end_time`` defaults to the end of the window. The window row is locked by a
+        conditional UPDATE, so bookings into one window commit one at a time; overlap
+        with the doctor's other scheduled appointments is rejected by the
+        ``ex_appointments_doctor_scheduled_overlap`` exclusion constraint. The window is
+        marked unavailable once it is fully booked. With ``outbox_kind``, a job for the
+        new appointment is committed in the same transaction. Returns None when the
+        booking was rejected.
+        """
+        try:
+            claimed = await self.session.execute(
+                update(Availability)
+                .where(
+                    Availability.id == availability_id,
+                    Availability.doctor_id == doctor_id,
+                    Availability.is_available == True,
+                    Availability.start_time <= appointment_time,
+                )
+                .values(updated_at=func.now())
+                .returning(Availability.end_time)
+            )
+            window_end = claimed.scalar_one_or_none()
+            if end_time is None and window_end is not None:
+                end_time = window_end
+            if window_end is None or not (appointment_time < end_time <= window_end):
+                await self.session.rollback()
+                return None
+
+            result = await self.session.execute(
+                insert(Appointment)
+                .values(
+                    doctor_id=doctor_id,
+                    patient_id=patient_id,
+                    availability_id=availability_id,
+                    appointment_time=appointment_time,
+                    end_time=end_time,
+                    status="scheduled",
+                )
+                .returning(Appointment)
+            )
+            appointment = result.scalar_one()
+            windows = await self.session.execute(
+                _refresh_capacity([availability_id]), execution_options={"synchronize_session": False}
+            )
+            windows = _snapshots(windows)
+            self._add_jobs(outbox_kind, [appointment])
+            await self.session.commit()
+        except IntegrityError:
+            # ex_appointments_doctor_scheduled_overlap: the range overlaps a scheduled appointment
+            await self.session.rollback()
+            return None
+        availability_index.invalidate(doctor_id)
+        slot_events.publish_windows(windows)
+        return appointment
+
+    async def create_many(
+        self,
+        patient_id: int,
+        bookings: Sequence[Tuple[Availability, datetime, datetime]],
+        outbox_kind: Optional[str] = None,
+    ) -> List[Optional[Appointment]]:
+        """Creates an appointment per (availability, appointment_time, end_time) booking, then commits.
+
+        Expects the availabilities to have been validated and row-locked in the current
+        transaction (see ``AvailabilityRepository.lock_many``). One batched INSERT ...
+        RETURNING creates the appointments and one UPDATE closes the windows that are
+        now fully booked. If a booking overlaps an appointment committed meanwhile, the
+        batch is retried one booking per savepoint so only the overlapping ones fail.
+        With ``outbox_kind``, a job per appointment is committed alongside. Returns the
+        appointments in booking order, None for each booking that failed.
+        """
+        if not bookings:
+            await self.session.commit()
+            return []
+
+        rows = [
+            {
+                "doctor_id": availability.doctor_id,
+                "patient_id": patient_id,
+                "availability_id": availability.id,
+                "appointment_time": appointment_time,
+                "end_time": end_time,
+                "status": "scheduled",
+            }
+            for availability, appointment_time, end_time in bookings
+        ]
+        try:
+            async with self.session.begin_nested():
+                result = await self.session.scalars(
+                    insert(Appointment).returning(Appointment, sort_by_parameter_order=True), rows
+                )
+                appointments: List[Optional[Appointment]] = list(result.all())
+        except IntegrityError:
+            # ex_appointments_doctor_scheduled_overlap: lost a race with a booking in an overlapping window
+            appointments = [await self._insert_scheduled(row) for row in rows]
+
+        created = [appointment for appointment in appointments if appointment is not None]
+        windows = []
+        if created:
+            windows = await self.session.execute(
+                _refresh_capacity(sorted({appointment.availability_id for appointment in created})),
+                execution_options={"synchronize_session": False},
+            )
+            windows = _snapshots(windows)
+        self._add_jobs(outbox_kind, created)
+        await self.session.commit()
+        for doctor_id in {appointment.doctor_id for appointment in created}:
+            availability_index.invalidate(doctor_id)
+        slot_events.publish_windows(windows)
+        return appointments
+
+    async def _insert_scheduled(self, values: dict) -> Optional[Appointment]:
+        """Inserts one appointment in a savepoint; None if it overlaps a scheduled appointment."""
+        try:
+            async with self.session.begin_nested():
+                result = await self.session.execute(insert(Appointment).values(**values).returning(Appointment))
+                return result.scalar_one()
+        except IntegrityError:
+            return None
+
+    async def get_scheduled_ranges(
+        self, doctor_ids: Sequence[int], start: datetime, end: datetime
+    ) -> Dict[int, List[Tuple[datetime, datetime]]]:
+        """Scheduled ``(appointment_time, end_time)`` ranges per doctor overlapping ``[start, end)``."""
+        result = await self.session.execute(
+            select(Appointment.doctor_id, Appointment.appointment_time, Appointment.end_time).where(
+                Appointment.doctor_id.in_(set(doctor_ids)),
+                Appointment.status == "scheduled",
+                Appointment.appointment_time < end,
+                Appointment.end_time > start,
+            )
+        )
+        ranges: Dict[int, List[Tuple[datetime, datetime]]] = {}
+        for doctor_id, appointment_time, end_time in result.all():
+            ranges.setdefault(doctor_id, []).append((appointment_time, end_time))
+        return ranges
+
+    async def lock_many(self, appointment_ids: Sequence[int]) -> Dict[int, Appointment]:
+        """Loads and row-locks the given appointments, in id order, for the rest of the transaction."""
+        result = await self.session.execute(
+            select(Appointment)
+            .where(Appointment.id.in_(set(appointment_ids)))
+            .order_by(Appointment.id)
+            .with_for_update()
         )
-        self.session.add(appointment)
+        return {appointment.id: appointment for appointment in result.scalars().all()}
+
+    async def cancel_many(self, appointments: Sequence[Appointment], outbox_kind: Optional[str] = None) -> None:
+        """Cancels the (locked) appointments and recomputes their windows' capacity, then commits.
+
+        With ``outbox_kind``, a job per appointment is committed in the same transaction.
+        """
+        if not appointments:
+            await self.session.commit()
+            return
+
+        await self.session.execute(
+            update(Appointment)
+            .where(Appointment.id.in_([appointment.id for appointment in appointments]))
+            .values(status="cancelled")
+        )
+        windows = await self.session.execute(
+            _refresh_capacity(sorted({appointment.availability_id for appointment in appointments})),
+            execution_options={"synchronize_session": False},
+        )
+        windows = _snapshots(windows)
+        self._add_jobs(outbox_kind, appointments)
         await self.session.commit()
-        await self.session.refresh(appointment)
-        return appointment
+        for doctor_id in {appointment.doctor_id for appointment in appointments}:
+            availability_index.invalidate(doctor_id)
+        slot_events.publish_windows(windows)
 
     async def get_by_id(self, appointment_id: int) -> Optional[Appointment]:
         result = await self.session.execute(
@@ -30,49 +207,150 @@ class AppointmentRepository:
         )
         return result.scalar_one_or_none()
 
-    async def get_by_patient_id(self, patient_id: int) -> List[Appointment]:
-        result = await self.session.execute(
+    async def get_by_patient_id(
+        self, patient_id: int, page: Optional[PageRequest] = None, with_details: bool = False
+    ) -> List[Appointment]:
+        query = (
             select(Appointment)
             .where(Appointment.patient_id == patient_id)
             .where(Appointment.status == "scheduled")
-            .order_by(Appointment.appointment_time)
+        )
+        if with_details:
+            query = query.options(*self._detail_options())
+        result = await execute_read(
+            self.session, apply_page(query, page, Appointment.id, Appointment.appointment_time)
         )
         return list(result.scalars().all())
 
-    async def get_by_doctor_id(self, doctor_id: int) -> List[Appointment]:
-        result = await self.session.execute(
+    async def get_by_doctor_id(
+        self, doctor_id: int, page: Optional[PageRequest] = None, with_details: bool = False
+    ) -> List[Appointment]:
+        query = (
             select(Appointment)
             .where(Appointment.doctor_id == doctor_id)
             .where(Appointment.status == "scheduled")
-            .order_by(Appointment.appointment_time)
+        )
+        if with_details:
+            query = query.options(*self._detail_options())
+        result = await execute_read(
+            self.session, apply_page(query, page, Appointment.id, Appointment.appointment_time)
         )
         return list(result.scalars().all())
 
-    async def check_conflict(
-        self, doctor_id: int, appointment_time: datetime, availability_id: int
-    ) -> bool:
+    async def get_changes(
+        self, page: PageRequest, patient_id: Optional[int] = None, doctor_id: Optional[int] = None
+    ) -> List[Appointment]:
+        """Appointments of every status changed after the page's cursor, in change order."""
+        query = select(Appointment)
+        if patient_id is not None:
+            query = query.where(Appointment.patient_id == patient_id)
+        if doctor_id is not None:
+            query = query.where(Appointment.doctor_id == doctor_id)
+        # Primary only: a lagging replica could let the cursor move past changes it has not applied yet
         result = await self.session.execute(
-            select(Appointment).where(
-                and_(
-                    Appointment.doctor_id == doctor_id,
-                    Appointment.availability_id == availability_id,
-                    Appointment.status == "scheduled"
-                )
-            )
+            apply_changes(query, page, Appointment.updated_at, Appointment.id, settings.delta_sync_settle_seconds)
         )
-        return result.scalar_one_or_none() is not None
+        return list(result.scalars().all())
 
-    async def cancel(self, appointment_id: int, user_id: int, user_role: str) -> Optional[Appointment]:
-        appointment = await self.get_by_id(appointment_id)
-        if not appointment:
-            return None
+    async def stream_history(
+        self,
+        doctor_id: Optional[int] = None,
+        patient_id: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Row]:
+        """Streams appointments of every status as plain rows through a server-side cursor.
 
-       
-        if user_role == "Patient" and appointment.patient_id != user_id:
+        Rows are fetched ``batch_size`` at a time and never enter the identity map, so
+        memory use does not depend on how many rows match.
+        """
+        query = select(*Appointment.__table__.columns).order_by(Appointment.appointment_time, Appointment.id)
+        if doctor_id is not None:
+            query = query.where(Appointment.doctor_id == doctor_id)
+        if patient_id is not None:
+            query = query.where(Appointment.patient_id == patient_id)
+        if start is not None:
+            query = query.where(Appointment.appointment_time >= start)
+        if end is not None:
+            query = query.where(Appointment.appointment_time < end)
+
+        await prefer_replica(self.session)
+        result = await self.session.stream(query.execution_options(yield_per=batch_size, **{READ_ONLY: True}))
+        async for row in result:
+            yield row
+
+    def _add_jobs(self, outbox_kind: Optional[str], appointments: Sequence[Appointment]) -> None:
+        """Stages an outbox job per appointment, committed with the caller's transaction."""
+        if outbox_kind is None:
+            return
+        outbox = OutboxRepository(self.session)
+        for appointment in appointments:
+            outbox.add(outbox_kind, {"appointment_id": appointment.id})
+
+    @staticmethod
+    def _detail_options():
+        # Both relationships are many-to-one, so joined loading fetches everything in one query
+        return joinedload(Appointment.doctor), joinedload(Appointment.patient)
+
+    async def cancel(
+        self, appointment_id: int, user_id: int, user_role: str, outbox_kind: Optional[str] = None
+    ) -> Optional[Appointment]:
+        """Cancels a scheduled appointment and reopens its window in one transaction.
+
+        The status change is a conditional UPDATE, so when two cancels race only the
+        one that changed the row stages the ``outbox_kind`` job. Returns None if the
+        appointment does not exist, belongs to another patient or is not scheduled.
+        """
+        query = (
+            update(Appointment)
+            .where(Appointment.id == appointment_id, Appointment.status == "scheduled")
+            .values(status="cancelled")
+            .returning(Appointment)
+        )
+        if user_role == "Patient":
+            query = query.where(Appointment.patient_id == user_id)
+        result = await self.session.execute(query)
+        appointment = result.scalar_one_or_none()
+        if appointment is None:
+            await self.session.rollback()
             return None
 
-        appointment.status = "cancelled"
+        windows = await self.session.execute(
+            _refresh_capacity([appointment.availability_id]), execution_options={"synchronize_session": False}
+        )
+        windows = _snapshots(windows)
+        self._add_jobs(outbox_kind, [appointment])
         await self.session.commit()
-        await self.session.refresh(appointment)
+        availability_index.invalidate(appointment.doctor_id)
+        slot_events.publish_windows(windows)
         return appointment
 
+_WINDOW_COLUMNS = (
+    Availability.id, Availability.doctor_id, Availability.start_time, Availability.end_time, Availability.is_available
+)
+
+
+def _snapshots(windows) -> List[AvailabilitySlot]:
+    """Published state of windows returned with ``_WINDOW_COLUMNS`` and ``BOOKED_COLUMNS``."""
+    return [snapshot(window, window.booked_starts, window.booked_ends) for window in windows]
+
+
+def _refresh_capacity(availability_ids):
+    """UPDATE leaving the given windows open only while scheduled appointments leave a gap.
+
+    A doctor's scheduled appointments never overlap, so a window is full exactly when
+    their durations add up to its length. Returns the updated windows' new state and
+    booked ranges.
+    """
+    booked = (
+        select(func.coalesce(func.sum(Appointment.end_time - Appointment.appointment_time), timedelta(0)))
+        .where(Appointment.availability_id == Availability.id, Appointment.status == "scheduled")
+        .scalar_subquery()
+    )
+    return (
+        update(Availability)
+        .where(Availability.id.in_(availability_ids))
+        .values(is_available=booked < Availability.end_time - Availability.start_time)
+        .returning(*_WINDOW_COLUMNS, *BOOKED_COLUMNS)
+    )
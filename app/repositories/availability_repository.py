@@ -1,15 +1,79 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from typing import List, Optional
+from sqlalchemy import select, insert, and_, case, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import aliased
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import datetime
-from app.models import Availability
+from app.config import settings
+from app.database import execute_read
+from app.models import Appointment, Availability
+from app.pagination import PageRequest, apply_changes, apply_page
+from app.availability_index import AvailabilitySlot, DoctorIntervals, availability_index, clip_free_ranges, snapshot
+from app.slot_events import slot_events
+
+
+def _booked(column):
+    """Correlated subquery: ``column`` of each window's scheduled appointments, in time order (NULL if none)."""
+    return (
+        select(func.array_agg(aggregate_order_by(column, Appointment.appointment_time)))
+        .where(Appointment.availability_id == Availability.id, Appointment.status == "scheduled")
+        .correlate(Availability)
+        .scalar_subquery()
+    )
+
+
+# Selected or returned alongside a window so its free ranges can be worked out (see ``snapshot``)
+BOOKED_COLUMNS = (
+    _booked(Appointment.appointment_time).label("booked_starts"),
+    _booked(Appointment.end_time).label("booked_ends"),
+)
+
+
+def _first_free(start: Optional[datetime]):
+    """Start of each window's first free range at or after ``start`` (NULL if it has none).
+
+    That is ``start``, or the window's start if later, unless a scheduled appointment
+    covers it; otherwise the earliest appointment end from there on that no other
+    appointment covers and that is before the window's end. Same as the first of
+    ``clip_free_ranges(snapshot(window, ...), start)``.
+    """
+    floor = Availability.start_time if start is None else func.greatest(Availability.start_time, start)
+    booked = aliased(Appointment)
+    covering = aliased(Appointment)
+
+    def covered(time):
+        return (
+            select(covering.id)
+            .where(
+                covering.availability_id == Availability.id,
+                covering.status == "scheduled",
+                covering.appointment_time <= time,
+                covering.end_time > time,
+            )
+            .correlate(Availability, booked)
+            .exists()
+        )
+
+    after_booking = (
+        select(func.min(booked.end_time))
+        .where(
+            booked.availability_id == Availability.id,
+            booked.status == "scheduled",
+            booked.end_time >= floor,
+            booked.end_time < Availability.end_time,
+            ~covered(booked.end_time),
+        )
+        .correlate(Availability)
+        .scalar_subquery()
+    )
+    return case((~covered(floor), floor), else_=after_booking)
 
 
 class AvailabilityRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create(self, doctor_id: int, start_time: datetime, end_time: datetime) -> Availability:
+    async def create(self, doctor_id: int, start_time: datetime, end_time: datetime) -> AvailabilitySlot:
         availability = Availability(
             doctor_id=doctor_id,
             start_time=start_time,
@@ -19,43 +83,140 @@ class AvailabilityRepository:
         self.session.add(availability)
         await self.session.commit()
         await self.session.refresh(availability)
-        return availability
+        availability_index.invalidate(doctor_id)
+        window = snapshot(availability)
+        slot_events.publish_windows([window])
+        return window
 
-    async def get_by_doctor_id(self, doctor_id: int) -> List[Availability]:
+    async def create_many(
+        self, doctor_id: int, windows: Sequence[Tuple[datetime, datetime]]
+    ) -> List[AvailabilitySlot]:
+        """Inserts all windows in one batched INSERT ... RETURNING, in ``windows`` order, and commits once."""
+        result = await self.session.scalars(
+            insert(Availability).returning(Availability, sort_by_parameter_order=True),
+            [
+                {"doctor_id": doctor_id, "start_time": start, "end_time": end, "is_available": True}
+                for start, end in windows
+            ],
+        )
+        availabilities = [snapshot(availability) for availability in result.all()]
+        await self.session.commit()
+        availability_index.invalidate(doctor_id)
+        slot_events.publish_windows(availabilities)
+        return availabilities
+
+    async def get_open_in_range(self, doctor_id: int, start: datetime, end: datetime) -> List[Availability]:
+        """Open windows overlapping ``[start, end)``, ordered by start time."""
         result = await self.session.execute(
             select(Availability)
+            .where(
+                Availability.doctor_id == doctor_id,
+                Availability.is_available == True,
+                Availability.start_time < end,
+                Availability.end_time > start,
+            )
+            .order_by(Availability.start_time)
+        )
+        return list(result.scalars().all())
+
+    async def get_by_doctor_id(self, doctor_id: int, page: Optional[PageRequest] = None) -> List[AvailabilitySlot]:
+        """The doctor's open windows, each with the free ranges that can still be booked."""
+        if availability_index.enabled:
+            return (await self.get_intervals(doctor_id)).page(page)
+
+        query = (
+            select(Availability, *BOOKED_COLUMNS)
             .where(Availability.doctor_id == doctor_id)
             .where(Availability.is_available == True)
         )
-        return list(result.scalars().all())
+        result = await execute_read(
+            self.session, apply_page(query, page, Availability.id, Availability.start_time)
+        )
+        return [snapshot(availability, starts, ends) for availability, starts, ends in result.all()]
 
-    async def get_by_id(self, availability_id: int) -> Optional[Availability]:
+    async def get_changes(self, doctor_id: int, page: PageRequest) -> List[AvailabilitySlot]:
+        """The doctor's windows, open or not, changed after the page's cursor, in change order."""
+        query = select(Availability, *BOOKED_COLUMNS).where(Availability.doctor_id == doctor_id)
+        # Primary only: a lagging replica could let the cursor move past changes it has not applied yet
         result = await self.session.execute(
-            select(Availability).where(Availability.id == availability_id)
+            apply_changes(
+                query, page, Availability.updated_at, Availability.id, settings.delta_sync_settle_seconds
+            )
         )
-        return result.scalar_one_or_none()
+        return [
+            snapshot(availability, starts, ends, availability.updated_at)
+            for availability, starts, ends in result.all()
+        ]
+
+    async def get_next_open(self, page: PageRequest) -> List[AvailabilitySlot]:
+        """Open windows across all doctors, earliest free time first.
+
+        A window that started before ``page.start`` is included while it still has a
+        gap after it. Windows are ranked, and keyset-paginated, by ``(first free start,
+        id)``, worked out in SQL from their scheduled appointments (see ``_first_free``),
+        and their free ranges are clipped to ``page.start``. ``page.end`` bounds the
+        first free start, so it also bounds the windows scanned on
+        ``ix_availabilities_open_start``.
+        """
+        ranked = select(Availability, *BOOKED_COLUMNS, _first_free(page.start).label("first_free")).where(
+            Availability.is_available == True
+        )
+        if page.start is not None:
+            ranked = ranked.where(Availability.end_time > page.start)
+        if page.end is not None:
+            ranked = ranked.where(Availability.start_time < page.end)
+        ranked = ranked.subquery()
+        window = aliased(Availability, ranked)
+        query = select(window, ranked.c.booked_starts, ranked.c.booked_ends).where(ranked.c.first_free.is_not(None))
+        result = await execute_read(self.session, apply_page(query, page, ranked.c.id, ranked.c.first_free))
+        return [
+            clip_free_ranges(snapshot(availability, starts, ends), page.start)
+            for availability, starts, ends in result.all()
+        ]
 
-    async def mark_unavailable(self, availability_id: int) -> None:
+    async def get_intervals(self, doctor_id: int) -> DoctorIntervals:
+        """The doctor's open windows from the in-process index, loading them on a miss."""
+        return await availability_index.get(doctor_id, lambda: self._load_open_slots(doctor_id))
+
+    async def _load_open_slots(self, doctor_id: int) -> List[AvailabilitySlot]:
+        # Always read from the primary: a lagging replica could repopulate the index with stale windows
         result = await self.session.execute(
-            select(Availability).where(Availability.id == availability_id)
+            select(
+                Availability.id,
+                Availability.doctor_id,
+                Availability.start_time,
+                Availability.end_time,
+                Availability.is_available,
+                *BOOKED_COLUMNS,
+            ).where(Availability.doctor_id == doctor_id, Availability.is_available == True)
         )
-        availability = result.scalar_one_or_none()
-        if availability:
-            availability.is_available = False
-            await self.session.commit()
+        return [snapshot(row, row.booked_starts, row.booked_ends) for row in result.all()]
 
-    async def mark_available(self, availability_id: int) -> None:
+    async def get_by_id(self, availability_id: int) -> Optional[Availability]:
         result = await self.session.execute(
             select(Availability).where(Availability.id == availability_id)
         )
-        availability = result.scalar_one_or_none()
-        if availability:
-            availability.is_available = True
-            await self.session.commit()
+        return result.scalar_one_or_none()
+
+    async def lock_many(self, availability_ids: Sequence[int]) -> Dict[int, Availability]:
+        """Loads and row-locks the given availabilities for the rest of the transaction.
+
+        Rows are locked in id order so concurrent batches cannot deadlock each other.
+        """
+        result = await self.session.execute(
+            select(Availability)
+            .where(Availability.id.in_(set(availability_ids)))
+            .order_by(Availability.id)
+            .with_for_update()
+        )
+        return {availability.id: availability for availability in result.scalars().all()}
 
     async def check_overlap(
         self, doctor_id: int, start_time: datetime, end_time: datetime, exclude_id: Optional[int] = None
     ) -> bool:
+        if availability_index.enabled and not exclude_id:
+            return (await self.get_intervals(doctor_id)).overlaps(start_time, end_time)
+
         query = select(Availability).where(
             and_(
                 Availability.doctor_id == doctor_id,
@@ -0,0 +1,68 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from typing import List, Optional, Tuple
+from datetime import timedelta
+from app.models import IdempotencyKey
+
+
+class IdempotencyRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def claim(self, key: str, fingerprint: str, lease: timedelta) -> bool:
+        """Makes the caller the owner of ``key`` unless a live claim or response exists, and commits.
+
+        An expired row is dropped first, so the key of a request whose owner died
+        becomes claimable once its ``lease`` runs out.
+        """
+        await self.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= func.now())
+        )
+        result = await self.session.execute(
+            insert(IdempotencyKey)
+            .values(key=key, fingerprint=fingerprint, expires_at=func.now() + lease)
+            .on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+            .returning(IdempotencyKey.key)
+        )
+        claimed = result.scalar_one_or_none() is not None
+        await self.session.commit()
+        return claimed
+
+    async def get(self, key: str) -> Optional[IdempotencyKey]:
+        """The live claim or stored response for ``key``; always read from the primary."""
+        return await self.session.scalar(
+            select(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at > func.now())
+        )
+
+    async def complete(
+        self, key: str, status_code: int, headers: List[Tuple[str, str]], body: bytes, ttl: timedelta
+    ) -> None:
+        """Stores the owner's response, replayed to duplicates until ``ttl`` from now."""
+        await self.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+            .values(status_code=status_code, headers=headers, body=body, expires_at=func.now() + ttl)
+        )
+        await self.session.commit()
+
+    async def release(self, key: str) -> None:
+        """Drops an unfinished claim so the next duplicate runs the request itself."""
+        await self.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+        )
+        await self.session.commit()
+
+    async def purge_expired(self, limit: int) -> int:
+        """Deletes up to ``limit`` expired rows and commits; returns how many were deleted."""
+        expired = (
+            select(IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at <= func.now())
+            .order_by(IdempotencyKey.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await self.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(expired)))
+        await self.session.commit()
+        return result.rowcount
@@ -0,0 +1,72 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, func
+from typing import List, Optional
+from datetime import datetime, timedelta
+from app.models import OutboxJob
+
+
+class OutboxRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def add(self, kind: str, payload: dict) -> OutboxJob:
+        """Stages a job in the current transaction; it is written by the caller's commit."""
+        job = OutboxJob(kind=kind, payload=payload, status="pending", attempts=0)
+        self.session.add(job)
+        return job
+
+    async def claim_due(self, limit: int, lease: timedelta) -> List[OutboxJob]:
+        """Claims up to ``limit`` due jobs for this worker and commits.
+
+        Claimed jobs count an attempt and are leased: they become due again after
+        ``lease`` unless completed first, so a crashed process's jobs are retried.
+        SKIP LOCKED lets several processes claim concurrently without waiting.
+        """
+        due = (
+            select(OutboxJob.id)
+            .where(OutboxJob.status == "pending", OutboxJob.run_after <= func.now())
+            .order_by(OutboxJob.run_after, OutboxJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await self.session.scalars(
+            update(OutboxJob)
+            .where(OutboxJob.id.in_(due))
+            .values(attempts=OutboxJob.attempts + 1, run_after=func.now() + lease)
+            .returning(OutboxJob),
+            execution_options={"synchronize_session": False},
+        )
+        jobs = list(result.all())
+        await self.session.commit()
+        return jobs
+
+    async def complete(self, job_id: int) -> None:
+        await self.session.execute(
+            update(OutboxJob).where(OutboxJob.id == job_id).values(status="done", last_error=None)
+        )
+        await self.session.commit()
+
+    async def fail(self, job_id: int, error: str, retry_at: Optional[datetime]) -> None:
+        """Records a failed attempt; the job is retried at ``retry_at``, or given up on if None."""
+        values = {"last_error": error[:2000]}
+        if retry_at is None:
+            values["status"] = "failed"
+        else:
+            values["run_after"] = retry_at
+        await self.session.execute(update(OutboxJob).where(OutboxJob.id == job_id).values(**values))
+        await self.session.commit()
+
+    async def purge_done(self, older_than: timedelta, limit: int) -> int:
+        """Deletes up to ``limit`` jobs finished more than ``older_than`` ago and commits; returns how many."""
+        finished = (
+            select(OutboxJob.id)
+            .where(OutboxJob.status == "done", OutboxJob.updated_at <= func.now() - older_than)
+            .order_by(OutboxJob.updated_at, OutboxJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await self.session.execute(delete(OutboxJob).where(OutboxJob.id.in_(finished)))
+        await self.session.commit()
+        return result.rowcount
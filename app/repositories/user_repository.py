@@ -1,7 +1,9 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from typing import Optional
+from app.database import execute_read
 from app.models import User, UserRole
+from app.pagination import PageRequest, apply_page
 
 
 class UserRepository:
@@ -20,6 +22,16 @@ class UserRepository:
         await self.session.refresh(user)
         return user
 
+    async def replace_password_hash(self, user_id: int, old_hash: str, new_hash: str) -> bool:
+        """Sets a new password hash only if it is still ``old_hash``, then commits; False if it changed meanwhile."""
+        result = await self.session.execute(
+            update(User)
+            .where(User.id == user_id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
+        await self.session.commit()
+        return result.rowcount == 1
+
     async def get_by_email(self, email: str) -> Optional[User]:
         result = await self.session.execute(
             select(User).where(User.email == email)
@@ -32,9 +44,10 @@ class UserRepository:
         )
         return result.scalar_one_or_none()
 
-    async def get_doctors(self) -> list[User]:
-        result = await self.session.execute(
-            select(User).where(User.role == UserRole.DOCTOR)
+    async def get_doctors(self, page: Optional[PageRequest] = None) -> list[User]:
+        query = select(User).where(User.role == UserRole.DOCTOR)
+        result = await execute_read(
+            self.session, apply_page(query, page, User.id, window_column=User.created_at)
         )
         return list(result.scalars().all())
 
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from datetime import datetime
+from typing import List, Literal, Optional
 from app.database import get_db
 from app.services.patient_service import PatientService
-from app.schemas import AppointmentCreate, AppointmentResponse
+from app.schemas import (
+    AppointmentChanges, AppointmentCreate, AppointmentResponse, AppointmentWithDetails,
+    BulkAppointmentCancel, BulkAppointmentCreate, BulkAppointmentResult
+)
 from app.middleware.auth_middleware import get_current_user, require_role
 from app.models import UserRole
+from app.pagination import PageRequest, changes_params, page_params
+from app.services.export_service import EXPORT_MEDIA_TYPES, export_appointments
+from app.serialization import list_response
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
@@ -31,21 +39,100 @@ async def book_appointment(
         )
 
 
-@router.get("/my-appointments", response_model=List[AppointmentResponse])
-async def get_my_appointments(
+@router.post("/bulk", response_model=BulkAppointmentResult)
+async def book_appointments(
+    request: BulkAppointmentCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_role([UserRole.PATIENT]))
+):
+    """Book up to 100 appointments in one transaction (Patient only)
+
+    Each item succeeds or fails independently; results are returned in request order.
+    """
+    patient_service = PatientService(db)
+    return await patient_service.book_appointments(current_user["user_id"], request.appointments)
+
+
+@router.post("/bulk-cancel", response_model=BulkAppointmentResult)
+async def cancel_appointments(
+    request: BulkAppointmentCancel,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_role([UserRole.PATIENT]))
 ):
-    """Get current user's appointments"""
+    """Cancel up to 100 appointments in one transaction (Patient only)"""
+    patient_service = PatientService(db)
+    return await patient_service.cancel_appointments(current_user["user_id"], request.appointment_ids)
+
+
+async def _my_appointments(db: AsyncSession, current_user: dict, page: PageRequest, with_details: bool):
     from app.repositories.appointment_repository import AppointmentRepository
-    
+
     appointment_repo = AppointmentRepository(db)
     if current_user["role"] == UserRole.DOCTOR.value:
-        appointments = await appointment_repo.get_by_doctor_id(current_user["user_id"])
-    else:
-        appointments = await appointment_repo.get_by_patient_id(current_user["user_id"])
-    
-    return appointments
+        return await appointment_repo.get_by_doctor_id(current_user["user_id"], page, with_details)
+    return await appointment_repo.get_by_patient_id(current_user["user_id"], page, with_details)
+
+
+@router.get("/my-appointments", response_model=List[AppointmentResponse])
+async def get_my_appointments(
+    response: Response,
+    page: PageRequest = Depends(page_params()),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get current user's appointments, paginated by appointment time"""
+    appointments = await _my_appointments(db, current_user, page, with_details=False)
+    page.set_next_cursor(response, appointments, lambda apt: (apt.appointment_time, apt.id))
+    return list_response(appointments, AppointmentResponse, response)
+
+
+@router.get("/my-appointments/details", response_model=List[AppointmentWithDetails])
+async def get_my_appointments_with_details(
+    response: Response,
+    page: PageRequest = Depends(page_params()),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get current user's appointments with the doctor and patient embedded"""
+    appointments = await _my_appointments(db, current_user, page, with_details=True)
+    page.set_next_cursor(response, appointments, lambda apt: (apt.appointment_time, apt.id))
+    return list_response(appointments, AppointmentWithDetails, response)
+
+
+@router.get("/changes", response_model=AppointmentChanges)
+async def get_my_appointment_changes(
+    page: PageRequest = Depends(changes_params()),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Delta sync: current user's appointments created, updated or cancelled since `cursor`
+
+    Unlike my-appointments this includes cancelled appointments, so clients can remove them.
+    Omit `cursor` for a full sync, then poll with the returned `cursor`. While `has_more` is
+    true, request again straight away.
+    """
+    patient_service = PatientService(db)
+    return await patient_service.get_appointment_changes(current_user["user_id"], current_user["role"], page)
+
+
+@router.get("/export")
+async def export_my_appointments(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream the current user's full appointment history as NDJSON or CSV"""
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be before 'to'"
+        )
+    return StreamingResponse(
+        export_appointments(current_user["user_id"], current_user["role"], export_format, start, end),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="appointments.{export_format}"'},
+    )
 
 
 @router.post("/{appointment_id}/cancel", response_model=AppointmentResponse)
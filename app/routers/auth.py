@@ -1,13 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
+from app.services.admission_control import AdmissionRejected, auth_admission
 from app.services.auth_service import AuthService
-from app.schemas import UserRegister, UserLogin, ForgotPasswordRequest, Token, UserResponse
+from app.services.password_hasher import PasswordHasherBusy
+from app.schemas import UserRegister, UserLogin, ForgotPasswordRequest, ResetPasswordRequest, Token, UserResponse
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+def _password_hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def admit_auth_request(request: Request):
+    """Sheds bcrypt-bound requests before they take a database connection or CPU time"""
+    client = request.client.host if request.client else "unknown"
+    try:
+        await auth_admission.admit(client)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail="Too many authentication requests, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    try:
+        yield
+    finally:
+        auth_admission.release()
+
+
+@router.post(
+    "/register",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(admit_auth_request)]
+)
 async def register(
     user_data: UserRegister,
     db: AsyncSession = Depends(get_db)
@@ -27,16 +59,21 @@ async def register(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(admit_auth_request)])
 async def login(
     user_data: UserLogin,
     db: AsyncSession = Depends(get_db)
 ):
     """Login and receive JWT token"""
     auth_service = AuthService(db)
-    token = await auth_service.login(user_data.email, user_data.password)
+    try:
+        token = await auth_service.login(user_data.email, user_data.password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
     
     if not token:
         raise HTTPException(
@@ -53,7 +90,7 @@ async def forgot_password(
     request: ForgotPasswordRequest,
     db: AsyncSession = Depends(get_db)
 ):
-    """Mock forgot password flow - returns success if user exists"""
+    """Queues a password reset email; the response does not reveal whether the user exists"""
     auth_service = AuthService(db)
     user_exists = await auth_service.forgot_password(request.email)
     
@@ -67,3 +104,21 @@ async def forgot_password(
             "message": "If an account with this email exists, a password reset link has been sent."
         }
 
+
+@router.post("/reset-password", dependencies=[Depends(admit_auth_request)])
+async def reset_password(
+    request: ResetPasswordRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Set a new password with the token from the password reset email; each token works once"""
+    auth_service = AuthService(db)
+    try:
+        await auth_service.reset_password(request.token, request.new_password)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
+    return {"message": "Password has been reset."}
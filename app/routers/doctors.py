@@ -1,43 +1,150 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from app.database import get_db
 from app.services.patient_service import PatientService
 from app.services.doctor_service import DoctorService
-from app.schemas import DoctorResponse, DoctorAvailabilityResponse, AvailabilityResponse, AvailabilityCreate
+from app.schemas import (
+    DoctorResponse,
+    DoctorAvailabilityResponse,
+    AvailabilityResponse,
+    AvailabilityChanges,
+    AvailabilityCreate,
+    AvailabilityTemplate,
+    AppointmentWithDetails,
+)
 from app.middleware.auth_middleware import get_current_user, require_role
 from app.models import UserRole
+from app.pagination import NEXT_CURSOR_HEADER, PageRequest, changes_params, page_params
+from app.services.doctor_directory import etag_matches
+from app.slot_events import TooManySubscribers
+from app.serialization import json_response, list_response
+from app.config import settings
 
 router = APIRouter(prefix="/doctors", tags=["doctors"])
 
 
-@router.get("", response_model=List[DoctorResponse])
+@router.get(
+    "",
+    response_model=List[DoctorResponse],
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}}
+)
 async def list_doctors(
+    page: PageRequest = Depends(page_params(keyed_by_time=False)),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """List all available doctors"""
+    """List all available doctors, paginated by id (`from`/`to` filter on registration time)
+
+    Responses carry an ETag; send it back as If-None-Match to get 304 Not Modified.
+    """
     patient_service = PatientService(db)
-    doctors = await patient_service.list_doctors()
-    return doctors
+    directory = await patient_service.get_doctor_directory(page)
+
+    headers = {"ETag": directory.etag, "Cache-Control": "private, no-cache"}
+    if directory.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = directory.next_cursor
+    if etag_matches(if_none_match, directory.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=directory.body, media_type="application/json", headers=headers)
+
+
+@router.get("/availability/next", response_model=List[AvailabilityResponse])
+async def find_next_available(
+    response: Response,
+    page: PageRequest = Depends(page_params()),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Open slots across all doctors, paginated by the start of their first free range
+
+    `from`/`to` bound that free start time; `from` defaults to now. `limit` is the number of slots.
+    """
+    patient_service = PatientService(db)
+    availabilities = await patient_service.find_next_available(page)
+    page.set_next_cursor(response, availabilities, lambda slot: (slot.free_ranges[0]["start_time"], slot.id))
+    return list_response(availabilities, AvailabilityResponse, response)
 
 
 @router.get("/{doctor_id}/availability", response_model=List[AvailabilityResponse])
 async def get_doctor_availability(
+    doctor_id: int,
+    response: Response,
+    page: PageRequest = Depends(page_params()),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get availability for a specific doctor, paginated by start time"""
+    patient_service = PatientService(db)
+    try:
+        availabilities = await patient_service.get_doctor_availability(doctor_id, page)
+        page.set_next_cursor(response, availabilities, lambda slot: (slot.start_time, slot.id))
+        return list_response(availabilities, AvailabilityResponse, response)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+
+@router.get("/{doctor_id}/availability/changes", response_model=AvailabilityChanges)
+async def get_doctor_availability_changes(
+    doctor_id: int,
+    page: PageRequest = Depends(changes_params()),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Delta sync: a doctor's slots created, opened or closed since `cursor`
+
+    Omit `cursor` for a full sync, then poll with the returned `cursor`. While `has_more` is true,
+    request again straight away.
+    """
+    patient_service = PatientService(db)
+    try:
+        return await patient_service.get_availability_changes(doctor_id, page)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+
+@router.get(
+    "/{doctor_id}/availability/stream",
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {"text/event-stream": {}}}}
+)
+async def stream_doctor_availability(
     doctor_id: int,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get availability for a specific doctor"""
+    """Server-Sent Events: `slot_opened` / `slot_closed` as the doctor's slots change
+
+    Each event carries the slot's current state. On `resync`, refetch the availability
+    (or poll /changes) because events were dropped for this client.
+    """
     patient_service = PatientService(db)
     try:
-        availabilities = await patient_service.get_doctor_availability(doctor_id)
-        return availabilities
+        events = await patient_service.watch_doctor_availability(doctor_id)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e)
         )
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event streams, please retry shortly",
+            headers={"Retry-After": "5"},
+        )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/availability", response_model=AvailabilityResponse, status_code=status.HTTP_201_CREATED)
@@ -61,21 +168,65 @@ async def set_availability(
         )
 
 
+@router.post(
+    "/availability/recurring",
+    response_model=List[AvailabilityResponse],
+    status_code=status.HTTP_201_CREATED
+)
+async def set_recurring_availability(
+    template: AvailabilityTemplate,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_role([UserRole.DOCTOR]))
+):
+    """Create availability slots from a weekly template (Doctor only)"""
+    doctor_service = DoctorService(db)
+    try:
+        return await doctor_service.create_recurring_availability(
+            current_user["user_id"],
+            template
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.get("/appointments/upcoming", response_model=List[dict])
 async def get_upcoming_appointments(
+    response: Response,
+    page: PageRequest = Depends(page_params()),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_role([UserRole.DOCTOR]))
 ):
-    """Get upcoming appointments (Doctor only)"""
+    """Get upcoming appointments (Doctor only), paginated by appointment time"""
     doctor_service = DoctorService(db)
-    appointments = await doctor_service.get_upcoming_appointments(current_user["user_id"])
-    return [
+    appointments = await doctor_service.get_upcoming_appointments(current_user["user_id"], page)
+    page.set_next_cursor(response, appointments, lambda apt: (apt.appointment_time, apt.id))
+    upcoming = [
         {
             "id": apt.id,
             "patient_id": apt.patient_id,
             "appointment_time": apt.appointment_time,
+            "end_time": apt.end_time,
             "status": apt.status
         }
         for apt in appointments
     ]
+    return json_response(upcoming, response) if settings.fast_json_responses else upcoming
 
+
+@router.get("/appointments/upcoming/details", response_model=List[AppointmentWithDetails])
+async def get_upcoming_appointments_with_details(
+    response: Response,
+    page: PageRequest = Depends(page_params()),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_role([UserRole.DOCTOR]))
+):
+    """Get upcoming appointments with the doctor and patient embedded (Doctor only)"""
+    doctor_service = DoctorService(db)
+    appointments = await doctor_service.get_upcoming_appointments(
+        current_user["user_id"], page, with_details=True
+    )
+    page.set_next_cursor(response, appointments, lambda apt: (apt.appointment_time, apt.id))
+    return list_response(appointments, AppointmentWithDetails, response)
@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Response
+from app.database import get_pool_stats, get_replica_stats
+from app.middleware.metrics_middleware import register_collector, render_gauges, render_metrics
+from app.services.admission_control import auth_admission
+from app.services.idempotency_store import idempotency_store
+from app.services.invalidation_bus import invalidation_bus
+from app.services.job_queue import job_queue
+from app.slot_events import slot_events
+
+router = APIRouter(tags=["monitoring"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _pool_metrics() -> list:
+    stats = {key.removeprefix("pool_"): value for key, value in get_pool_stats().items()}
+    return render_gauges("db_pool", "Database connection pool statistic for this worker.", stats)
+
+
+def _replica_metrics() -> list:
+    stats = get_replica_stats()
+    if not stats["configured"]:
+        return []
+    stats = {key.removeprefix("pool_"): float(value) for key, value in stats.items() if key != "configured"}
+    return render_gauges("db_replica", "Read replica routing and pool statistic for this worker.", stats)
+
+
+def _admission_metrics() -> list:
+    stats = auth_admission.stats()
+    lines = render_gauges(
+        "auth_admission", "Admission control state for /auth/register and /auth/login.",
+        {"in_flight": stats["in_flight"], "queued": stats["queued"]},
+    )
+    lines.extend([
+        "# HELP auth_admission_admitted_total Auth requests admitted.",
+        "# TYPE auth_admission_admitted_total counter",
+        f"auth_admission_admitted_total {stats['admitted']}",
+        "# HELP auth_admission_rejected_total Auth requests shed, by reason.",
+        "# TYPE auth_admission_rejected_total counter",
+    ])
+    lines.extend(
+        f'auth_admission_rejected_total{{reason="{reason}"}} {count}'
+        for reason, count in auth_admission.rejected.items()
+    )
+    return lines
+
+
+def _job_queue_metrics() -> list:
+    stats = job_queue.stats()
+    lines = render_gauges(
+        "job_queue", "Background job queue state for this worker.",
+        {"queued": stats["queued"], "in_progress": stats["in_progress"]},
+    )
+    lines.extend([
+        "# HELP job_queue_jobs_total Background job attempts finished, by outcome.",
+        "# TYPE job_queue_jobs_total counter",
+    ])
+    lines.extend(
+        f'job_queue_jobs_total{{outcome="{outcome}"}} {stats[outcome]}' for outcome in ("completed", "retried", "failed")
+    )
+    return lines
+
+
+def _idempotency_metrics() -> list:
+    return render_gauges(
+        "idempotency", "Idempotency-Key response store state for this worker.", idempotency_store.stats()
+    )
+
+
+def _invalidation_metrics() -> list:
+    stats = {key: float(value) for key, value in invalidation_bus.stats().items()}
+    return render_gauges("invalidation_bus", "Cross-worker cache invalidation bus statistic for this worker.", stats)
+
+
+def _slot_event_metrics() -> list:
+    return render_gauges("slot_events", "Availability event stream statistic for this worker.", slot_events.stats())
+
+
+register_collector(_pool_metrics)
+register_collector(_replica_metrics)
+register_collector(_admission_metrics)
+register_collector(_job_queue_metrics)
+register_collector(_idempotency_metrics)
+register_collector(_invalidation_metrics)
+register_collector(_slot_event_metrics)
+
+
+@router.get("/health/db-pool")
+async def db_pool_stats():
+    """Live database connection pool statistics for this worker"""
+    return {**get_pool_stats(), "replica": get_replica_stats()}
+
+
+@router.get("/health/auth-admission")
+async def auth_admission_stats():
+    """Auth admission control: running and queued requests, admissions and rejections for this worker"""
+    return auth_admission.stats()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker"""
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/health/jobs")
+async def job_queue_stats():
+    """Background job queue: queued and running jobs and attempt outcomes for this worker"""
+    return job_queue.stats()
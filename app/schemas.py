@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
+from datetime import datetime, date, time
 from typing import Optional, List
 from app.models import UserRole
 
@@ -21,6 +21,11 @@ class ForgotPasswordRequest(BaseModel):
     email: EmailStr
 
 
+class ResetPasswordRequest(BaseModel):
+    token: str
+    new_password: str = Field(..., min_length=8)
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -49,21 +54,61 @@ class AvailabilityCreate(BaseModel):
     end_time: datetime
 
 
+class AvailabilityTemplate(BaseModel):
+    """Weekly recurring availability, e.g. Mon-Fri 09:00-17:00 in 30-minute slots for 12 weeks"""
+    weekdays: List[int] = Field(..., min_length=1, description="0 = Monday ... 6 = Sunday")
+    start_time: time
+    end_time: time
+    slot_minutes: int = Field(30, ge=5, le=24 * 60)
+    start_date: date
+    weeks: int = Field(..., ge=1, le=52)
+    timezone: str = "UTC"
+
+    @field_validator("weekdays")
+    @classmethod
+    def validate_weekdays(cls, weekdays: List[int]) -> List[int]:
+        if any(day < 0 or day > 6 for day in weekdays):
+            raise ValueError("weekdays must be between 0 (Monday) and 6 (Sunday)")
+        return sorted(set(weekdays))
+
+
+class TimeRange(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
 class AvailabilityResponse(BaseModel):
     id: int
     doctor_id: int
     start_time: datetime
     end_time: datetime
     is_available: bool
+    free_ranges: List[TimeRange] = Field(
+        ..., description="Parts of the window not yet booked, in time order; empty once it is closed"
+    )
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class AvailabilityChange(AvailabilityResponse):
+    updated_at: datetime
+
+
+class AvailabilityChanges(BaseModel):
+    """Availability windows opened, closed or created since a delta-sync cursor."""
+    changes: List[AvailabilityChange]
+    cursor: Optional[str]
+    has_more: bool
+
+
 # Appointment Schemas
 class AppointmentCreate(BaseModel):
     doctor_id: int
     availability_id: int
     appointment_time: datetime
+    duration_minutes: Optional[int] = Field(
+        None, ge=5, le=24 * 60, description="Defaults to the rest of the availability window"
+    )
 
 
 class AppointmentResponse(BaseModel):
@@ -72,17 +117,50 @@ class AppointmentResponse(BaseModel):
     patient_id: int
     availability_id: int
     appointment_time: datetime
+    end_time: datetime
     status: str
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class AppointmentChange(AppointmentResponse):
+    updated_at: datetime
+
+
+class AppointmentChanges(BaseModel):
+    """Appointments created, updated or cancelled since a delta-sync cursor."""
+    changes: List[AppointmentChange]
+    cursor: Optional[str]
+    has_more: bool
+
+
 class AppointmentWithDetails(AppointmentResponse):
     doctor: UserResponse
     patient: UserResponse
 
 
+class BulkAppointmentCreate(BaseModel):
+    appointments: List[AppointmentCreate] = Field(..., min_length=1, max_length=100)
+
+
+class BulkAppointmentCancel(BaseModel):
+    appointment_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    success: bool
+    appointment: Optional[AppointmentResponse] = None
+    error: Optional[str] = None
+
+
+class BulkAppointmentResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
 # Doctor Schemas
 class DoctorResponse(UserResponse):
     pass
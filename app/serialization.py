@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Sequence, Tuple, Type, Union
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# (field name, nested plan or None) for every field of a response schema
+_Plan = Tuple[Tuple[str, Any], ...]
+_plans: Dict[Type[BaseModel], _Plan] = {}
+
+
+def _plan_for(schema: Type[BaseModel]) -> _Plan:
+    plan = _plans.get(schema)
+    if plan is None:
+        fields = []
+        for name, field in schema.model_fields.items():
+            annotation = field.annotation
+            nested = isinstance(annotation, type) and issubclass(annotation, BaseModel)
+            fields.append((name, _plan_for(annotation) if nested else None))
+        plan = _plans[schema] = tuple(fields)
+    return plan
+
+
+def _extract(obj: Any, plan: _Plan) -> Dict[str, Any]:
+    return {
+        name: getattr(obj, name) if nested is None else _extract(getattr(obj, name), nested)
+        for name, nested in plan
+    }
+
+
+def dump_rows(rows: Sequence[Any], schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """Reads ``schema``'s fields straight off ORM rows, without Pydantic validation."""
+    plan = _plan_for(schema)
+    return [_extract(row, plan) for row in rows]
+
+
+def encode_json(data: Any) -> bytes:
+    """Encodes plain data with orjson when installed, else pydantic-core.
+
+    Both produce the same output as the default ``response_model`` path for the
+    types used here (UTC datetimes as ``...Z``, enums by value).
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_UTC_Z)
+    return to_json(data)
+
+
+def list_response(
+    rows: Sequence[Any], schema: Type[BaseModel], response: Response
+) -> Union[Sequence[Any], Response]:
+    """Returns ``rows`` for FastAPI to validate and encode, or, with ``fast_json_responses``
+    enabled, an already encoded response carrying the headers set on ``response``."""
+    if not settings.fast_json_responses:
+        return rows
+    return json_response(dump_rows(rows, schema), response)
+
+
+def json_response(data: Any, response: Response) -> Response:
+    """Encodes ``data`` with ``encode_json``, keeping headers set on the injected ``response``."""
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return Response(content=encode_json(data), media_type="application/json", headers=headers)
+
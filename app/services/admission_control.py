@@ -0,0 +1,161 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict
+from app.config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the HTTP status and a Retry-After hint."""
+
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average, with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Takes a token; returns 0 on success, otherwise the seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def give_back(self, count: int) -> None:
+        """Returns ``count`` tokens that were taken but not used."""
+        self.tokens = min(self.burst, self.tokens + count)
+
+
+class AdmissionController:
+    """In-process admission control for CPU-heavy routes.
+
+    A request must pass its client's token bucket (else 429) and the global one
+    (else 503). At most ``max_concurrent`` admitted requests run at once; up to
+    ``max_queue`` more wait up to ``queue_timeout`` seconds for a slot, and anything
+    beyond that is rejected with 503 straight away. A rate of 0 disables that bucket.
+    Per-client buckets are kept for the ``max_clients`` most recently seen clients.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        global_rate: float,
+        global_burst: int,
+        client_rate: float,
+        client_burst: int,
+        max_clients: int,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.global_bucket = TokenBucket(global_rate, global_burst) if global_rate > 0 else None
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"client_rate": 0, "global_rate": 0, "queue_full": 0, "queue_timeout": 0}
+        self._clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def admit(self, client: str) -> None:
+        """Waits for a slot or raises ``AdmissionRejected``; pair every success with ``release``."""
+        now = time.monotonic()
+        wait = self._client_bucket(client).take(now) if self.client_rate > 0 else 0.0
+        if wait:
+            self._reject("client_rate", 429, wait)
+        wait = self.global_bucket.take(now) if self.global_bucket is not None else 0.0
+        if wait:
+            self._reject("global_rate", 503, wait)
+
+        if self.max_concurrent <= 0 or (self.in_flight < self.max_concurrent and not self._waiters):
+            self.in_flight += 1
+        else:
+            await self._wait_for_slot()
+        self.admitted += 1
+
+    def release(self) -> None:
+        # Hand the slot straight to the next waiter so in_flight never exceeds the limit
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def _wait_for_slot(self) -> None:
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full", 503, self.queue_timeout)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                return  # the slot arrived as the timeout fired
+            waiter.cancel()
+            self._reject("queue_timeout", 503, self.queue_timeout)
+        except asyncio.CancelledError:
+            # Client went away while queued; pass on a slot that was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters and waiter.done():
+                self._waiters.remove(waiter)
+
+    def _client_bucket(self, client: str) -> TokenBucket:
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = self._clients[client] = TokenBucket(self.client_rate, self.client_burst)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        return bucket
+
+    def _reject(self, reason: str, status_code: int, retry_after: float) -> None:
+        self.rejected[reason] += 1
+        raise AdmissionRejected(status_code, retry_after, reason)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            **{f"rejected_{reason}": count for reason, count in self.rejected.items()},
+        }
+
+
+auth_admission = AdmissionController(
+    max_concurrent=settings.auth_max_concurrent,
+    max_queue=settings.auth_max_queue,
+    queue_timeout=settings.auth_queue_timeout,
+    global_rate=settings.auth_global_rate,
+    global_burst=settings.auth_global_burst,
+    client_rate=settings.auth_client_rate,
+    client_burst=settings.auth_client_burst,
+    max_clients=settings.auth_max_clients,
+)
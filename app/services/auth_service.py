@@ -1,27 +1,37 @@
+import hashlib
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.repositories.user_repository import UserRepository
 from app.schemas import TokenData
 from app.models import User
+from app.services.password_hasher import hash_password, password_hasher, verify_password
+from app.services.token_cache import token_cache
+from app.services.doctor_directory import doctor_directory
+from app.services.job_queue import job_queue
+from app.services.notifications import PASSWORD_RESET
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+PASSWORD_RESET_PURPOSE = "password_reset"
+PASSWORD_RESET_EXPIRE_MINUTES = 30
+from app.repositories.outbox_repository import OutboxRepository
 
 
 class AuthService:
     def __init__(self, session: AsyncSession):
+        self.session = session
         self.user_repo = UserRepository(session)
 
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        """Blocking bcrypt check; request handlers use ``password_hasher.verify`` instead."""
+        return verify_password(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+        """Blocking bcrypt hash; request handlers use ``password_hasher.hash`` instead."""
+        return hash_password(password)
 
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -36,6 +46,10 @@ class AuthService:
 
     @staticmethod
     def verify_token(token: str) -> Optional[TokenData]:
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+
         try:
             payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
             email: str = payload.get("sub")
@@ -49,10 +63,35 @@ class AuthService:
                 role = UserRole(role_str)
             except ValueError:
                 return None
-            return TokenData(email=email, user_id=user_id, role=role)
+            token_data = TokenData(email=email, user_id=user_id, role=role)
+            expires_at = payload.get("exp")
+            if expires_at is not None:
+                token_cache.put(token, token_data, float(expires_at))
+            return token_data
         except JWTError:
             return None
 
+    @staticmethod
+    def _password_fingerprint(password_hash: str) -> str:
+        return hashlib.sha256(password_hash.encode()).hexdigest()[:16]
+
+    @classmethod
+    def create_password_reset_token(cls, user: User) -> str:
+        """A short-lived token that resets ``user``'s password once.
+
+        It has no role, so it is never accepted as an access token, and it is bound to
+        the current password hash, so it stops working once the password changes.
+        """
+        return cls.create_access_token(
+            data={
+                "sub": user.email,
+                "user_id": user.id,
+                "purpose": PASSWORD_RESET_PURPOSE,
+                "pwd": cls._password_fingerprint(user.password_hash),
+            },
+            expires_delta=timedelta(minutes=PASSWORD_RESET_EXPIRE_MINUTES),
+        )
+
     async def register(self, email: str, password: str, role: str, name: str) -> User:
         # Check if user already exists
         existing_user = await self.user_repo.get_by_email(email)
@@ -66,8 +105,10 @@ class AuthService:
         except ValueError:
             raise ValueError(f"Invalid role: {role}. Must be 'Doctor' or 'Patient'")
 
-        password_hash = self.get_password_hash(password)
+        password_hash = await password_hasher.hash(password)
         user = await self.user_repo.create(email, password_hash, user_role, name)
+        if user_role == UserRole.DOCTOR:
+            doctor_directory.invalidate()
         return user
 
     async def login(self, email: str, password: str) -> Optional[str]:
@@ -75,7 +116,7 @@ class AuthService:
         if not user:
             return None
 
-        if not self.verify_password(password, user.password_hash):
+        if not await password_hasher.verify(password, user.password_hash):
             return None
 
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
@@ -86,7 +127,32 @@ class AuthService:
         return access_token
 
     async def forgot_password(self, email: str) -> bool:
-        """Mock forgot password flow - just checks if user exists"""
+        """Queues a password reset email if the user exists; the email is sent in the background"""
         user = await self.user_repo.get_by_email(email)
-        return user is not None
+        if user is None:
+            return False
+
+        OutboxRepository(self.session).add(PASSWORD_RESET, {"user_id": user.id})
+        await self.session.commit()
+        job_queue.notify()
+        return True
+
+    async def reset_password(self, token: str, new_password: str) -> None:
+        """Sets a new password using a token from the password reset email."""
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        except JWTError:
+            raise ValueError("Invalid or expired reset token")
+        user_id = payload.get("user_id")
+        if payload.get("purpose") != PASSWORD_RESET_PURPOSE or user_id is None:
+            raise ValueError("Invalid or expired reset token")
+
+        user = await self.user_repo.get_by_id(user_id)
+        if user is None or payload.get("pwd") != self._password_fingerprint(user.password_hash):
+            raise ValueError("Invalid or expired reset token")
+
+        password_hash = await password_hasher.hash(new_password)
+        # Conditional on the old hash, so a token cannot be used twice even concurrently
+        if not await self.user_repo.replace_password_hash(user.id, user.password_hash, password_hash):
+            raise ValueError("Invalid or expired reset token")
 
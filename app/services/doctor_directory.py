@@ -0,0 +1,79 @@
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, List, Optional
+from pydantic import TypeAdapter
+from app.config import settings
+from app.schemas import DoctorResponse
+from app.serialization import dump_rows, encode_json
+
+_doctor_list_adapter = TypeAdapter(List[DoctorResponse])
+
+
+@dataclass(frozen=True)
+class DirectoryPage:
+    """A serialized page of the doctor directory."""
+    body: bytes
+    etag: str
+    next_cursor: Optional[str]
+
+
+def serialize_doctors(doctors: list) -> bytes:
+    if settings.fast_json_responses:
+        return encode_json(dump_rows(doctors, DoctorResponse))
+    return _doctor_list_adapter.dump_json(_doctor_list_adapter.validate_python(doctors, from_attributes=True))
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+class DoctorDirectoryCache:
+    """Serialized doctor-list pages, keyed by page parameters.
+
+    The whole cache is dropped whenever a doctor registers. ``version`` lets a
+    request that started before an invalidation avoid storing a stale page.
+    ``on_invalidate``, when set, is called on each invalidation so other worker
+    processes can drop their pages too.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.version = 0
+        self._pages: "OrderedDict[Hashable, DirectoryPage]" = OrderedDict()
+        self.on_invalidate: Optional[Callable[[], None]] = None
+
+    def get(self, key: Hashable) -> Optional[DirectoryPage]:
+        page = self._pages.get(key)
+        if page is not None:
+            self._pages.move_to_end(key)
+        return page
+
+    def put(self, key: Hashable, page: DirectoryPage, version: int) -> None:
+        if self.max_entries <= 0 or version != self.version:
+            return
+        self._pages[key] = page
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.max_entries:
+            self._pages.popitem(last=False)
+
+    def invalidate(self, broadcast: bool = True) -> None:
+        self.version += 1
+        self._pages.clear()
+        if broadcast and self.max_entries > 0 and self.on_invalidate is not None:
+            self.on_invalidate()
+
+
+doctor_directory = DoctorDirectoryCache(max_entries=settings.doctor_directory_cache_size)
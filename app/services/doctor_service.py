@@ -1,11 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from app.repositories.availability_repository import AvailabilityRepository
 from app.repositories.appointment_repository import AppointmentRepository
 from app.repositories.user_repository import UserRepository
-from app.models import Availability, Appointment
-from app.schemas import AvailabilityCreate
+from app.models import Appointment
+from app.availability_index import AvailabilitySlot
+from app.schemas import AvailabilityCreate, AvailabilityTemplate
+from app.pagination import PageRequest
+
+MAX_TEMPLATE_SLOTS = 5000
 
 
 class DoctorService:
@@ -14,7 +19,7 @@ class DoctorService:
         self.appointment_repo = AppointmentRepository(session)
         self.user_repo = UserRepository(session)
 
-    async def set_availability(self, doctor_id: int, availability: AvailabilityCreate) -> Availability:
+    async def set_availability(self, doctor_id: int, availability: AvailabilityCreate) -> AvailabilitySlot:
         # Check for overlapping availabilities
         has_overlap = await self.availability_repo.check_overlap(
             doctor_id, availability.start_time, availability.end_time
@@ -32,6 +37,56 @@ class DoctorService:
             doctor_id, availability.start_time, availability.end_time
         )
 
-    async def get_upcoming_appointments(self, doctor_id: int) -> List[Appointment]:
-        return await self.appointment_repo.get_by_doctor_id(doctor_id)
+    async def create_recurring_availability(
+        self, doctor_id: int, template: AvailabilityTemplate
+    ) -> List[AvailabilitySlot]:
+        slots = self.generate_template_slots(template)
+        if not slots:
+            raise ValueError("Template does not produce any future slots")
+        if len(slots) > MAX_TEMPLATE_SLOTS:
+            raise ValueError(f"Template produces {len(slots)} slots; the maximum is {MAX_TEMPLATE_SLOTS}")
+
+        # One query for every existing window in the template's range, then a merge-style sweep
+        existing = await self.availability_repo.get_open_in_range(doctor_id, slots[0][0], slots[-1][1])
+        index = 0
+        for start, end in slots:
+            while index < len(existing) and existing[index].end_time <= start:
+                index += 1
+            if index < len(existing) and existing[index].start_time < end:
+                raise ValueError(
+                    f"Slot {start.isoformat()} - {end.isoformat()} overlaps with existing time slot"
+                )
+
+        return await self.availability_repo.create_many(doctor_id, slots)
+
+    @staticmethod
+    def generate_template_slots(template: AvailabilityTemplate) -> List[Tuple[datetime, datetime]]:
+        """Expands a weekly template into future (start, end) slots in UTC, ordered by start."""
+        if template.start_time >= template.end_time:
+            raise ValueError("Start time must be before end time")
+        try:
+            zone = ZoneInfo(template.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone: {template.timezone}")
+
+        now = datetime.now(timezone.utc)
+        step = timedelta(minutes=template.slot_minutes)
+        slots = []
+        for offset in range(template.weeks * 7):
+            day = template.start_date + timedelta(days=offset)
+            if day.weekday() not in template.weekdays:
+                continue
+            start = datetime.combine(day, template.start_time, tzinfo=zone)
+            day_end = datetime.combine(day, template.end_time, tzinfo=zone)
+            while start + step <= day_end:
+                slot_start = start.astimezone(timezone.utc)
+                if slot_start >= now:
+                    slots.append((slot_start, (start + step).astimezone(timezone.utc)))
+                start += step
+        return slots
+
+    async def get_upcoming_appointments(
+        self, doctor_id: int, page: Optional[PageRequest] = None, with_details: bool = False
+    ) -> List[Appointment]:
+        return await self.appointment_repo.get_by_doctor_id(doctor_id, page, with_details)
 
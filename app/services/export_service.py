@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from app.database import AsyncSessionLocal
+from app.models import Appointment, UserRole
+from app.repositories.appointment_repository import AppointmentRepository
+
+EXPORT_COLUMNS = [column.name for column in Appointment.__table__.columns]
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _jsonable(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def export_appointments(
+    user_id: int,
+    role: str,
+    export_format: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    chunk_rows: int = 500,
+) -> AsyncIterator[bytes]:
+    """Yields the user's appointment history as NDJSON or CSV, ``chunk_rows`` rows per chunk.
+
+    The export opens its own session because the response body is produced after the
+    request's dependencies have been torn down.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == "csv" else None
+    if writer is not None:
+        writer.writerow(EXPORT_COLUMNS)
+
+    filters = {"doctor_id": user_id} if role == UserRole.DOCTOR.value else {"patient_id": user_id}
+    async with AsyncSessionLocal() as session:
+        pending = 0
+        async for row in AppointmentRepository(session).stream_history(start=start, end=end, **filters):
+            if writer is not None:
+                writer.writerow([_jsonable(value) for value in row])
+            else:
+                buffer.write(json.dumps({key: _jsonable(value) for key, value in row._mapping.items()}))
+                buffer.write("\n")
+            pending += 1
+            if pending >= chunk_rows:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
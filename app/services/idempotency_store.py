@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional, Tuple
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.repositories.idempotency_repository import IdempotencyRepository
+
+logger = logging.getLogger(__name__)
+
+# Expired rows are deleted in batches of this size, at most once per interval per worker
+PURGE_BATCH = 1000
+PURGE_INTERVAL = 60.0
+MAX_POLL_INTERVAL = 1.0
+
+
+@dataclass
+class StoredResponse:
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+
+class IdempotencyConflict(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class IdempotencyStore:
+    """Responses to requests sent with an ``Idempotency-Key``, shared by every worker process.
+
+    Keys live in the ``idempotency_keys`` table. The first request with a key
+    claims the row and runs; duplicates arriving on any worker while it runs poll
+    the row, then every duplicate within ``ttl`` seconds gets the stored response.
+    A key reused with a different request is a conflict. A claim expires after
+    ``lease`` seconds, so a key whose owner died can be claimed again.
+    """
+
+    def __init__(self, enabled: bool, ttl: float, lease: float, wait_timeout: float, poll_interval: float):
+        self.enabled = enabled
+        self.ttl = timedelta(seconds=ttl)
+        self.lease = timedelta(seconds=lease)
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.replayed = 0
+        self.waited = 0
+        self.in_flight = 0
+        self._last_purge = 0.0
+
+    async def acquire(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """The stored response for ``key``, or None once the caller owns the key and must run the request.
+
+        An owner must finish with ``complete`` or ``release``. Raises
+        ``IdempotencyConflict`` if the key was used for a different request, or if
+        the owner is still running after ``wait_timeout`` seconds.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        delay = self.poll_interval
+        waiting = False
+        while True:
+            async with AsyncSessionLocal() as session:
+                repository = IdempotencyRepository(session)
+                if await repository.claim(key, fingerprint, self.lease):
+                    self.in_flight += 1
+                    return None
+                record = await repository.get(key)
+            # With no record, the key was released or expired since the claim attempt: claim it again
+            if record is not None:
+                self._check(fingerprint, record.fingerprint)
+                if record.status_code is not None:
+                    self.replayed += 1
+                    return StoredResponse(
+                        record.status_code,
+                        [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record.headers],
+                        record.body,
+                    )
+                if not waiting:
+                    waiting = True
+                    self.waited += 1
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise IdempotencyConflict(409, "A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, MAX_POLL_INTERVAL)
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        """Stores the owner's response for the duplicates to replay."""
+        self.in_flight -= 1
+        async with AsyncSessionLocal() as session:
+            repository = IdempotencyRepository(session)
+            await repository.complete(
+                key,
+                response.status,
+                [(name.decode("latin-1"), value.decode("latin-1")) for name, value in response.headers],
+                response.body,
+                self.ttl,
+            )
+            await self._maybe_purge(repository)
+
+    async def release(self, key: str) -> None:
+        """Gives up ownership without storing; the next duplicate runs the request itself."""
+        self.in_flight -= 1
+        async with AsyncSessionLocal() as session:
+            await IdempotencyRepository(session).release(key)
+
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "replayed": self.replayed, "waited": self.waited}
+
+    @staticmethod
+    def _check(fingerprint: str, expected: str) -> None:
+        if fingerprint != expected:
+            raise IdempotencyConflict(422, "This Idempotency-Key was already used for a different request")
+
+    async def _maybe_purge(self, repository: IdempotencyRepository) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        deleted = await repository.purge_expired(PURGE_BATCH)
+        if deleted:
+            logger.debug("Purged %d expired idempotency keys", deleted)
+
+
+idempotency_store = IdempotencyStore(
+    enabled=settings.idempotency_enabled,
+    ttl=settings.idempotency_ttl_seconds,
+    lease=settings.idempotency_lease_seconds,
+    wait_timeout=settings.idempotency_wait_timeout,
+    poll_interval=settings.idempotency_poll_interval,
+)
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import os
+import secrets
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncpg
+from sqlalchemy.engine import make_url
+from app.config import settings
+from app.availability_index import availability_index
+from app.services.doctor_directory import doctor_directory
+from app.slot_events import slot_events
+
+logger = logging.getLogger(__name__)
+
+# Topics
+AVAILABILITY = "availability"
+DOCTORS = "doctors"
+SLOT_EVENTS = "slot_events"
+
+MAX_RECONNECT_DELAY = 30.0
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7999
+
+# (apply an invalidation received from another process, drop everything)
+Subscription = Tuple[Callable[[Any], None], Callable[[], None]]
+
+
+class InvalidationBus:
+    """Fans in-process cache invalidations out to the other worker processes.
+
+    Each worker keeps one dedicated Postgres connection that LISTENs on
+    ``channel``; local invalidations are sent with ``pg_notify`` by a background
+    task, so a write never waits on the bus. A worker ignores its own messages.
+    While the connection is down notifications may be missed, so every
+    (re)connect drops all subscribed caches. Until ``start`` is called
+    invalidations stay local to the process.
+    """
+
+    def __init__(self, database_url: str, channel: str, queue_limit: int, keepalive: float):
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.queue_limit = queue_limit
+        self.keepalive = keepalive
+        self.origin = f"{os.getpid()}-{secrets.token_hex(4)}"
+        self.connected = False
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self._subscriptions: Dict[str, Subscription] = {}
+        self._outgoing: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(
+        self, topic: str, apply: Callable[[Any], None], reset: Callable[[], None]
+    ) -> Callable[..., None]:
+        """Registers a cache under ``topic``; returns the function that publishes its invalidations."""
+        self._subscriptions[topic] = (apply, reset)
+        return lambda key=None: self.publish(topic, key)
+
+    def publish(self, topic: str, key: Any = None) -> None:
+        if self._outgoing is None:
+            return
+        payload = json.dumps({"o": self.origin, "t": topic, "k": key})
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            logger.warning("Invalidation bus message for %s is too large to send", topic)
+            self.dropped += 1
+            return
+        try:
+            self._outgoing.put_nowait(payload)
+        except asyncio.QueueFull:
+            # Other workers fall back to their own invalidations; count it so it shows in /metrics
+            self.dropped += 1
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._outgoing = asyncio.Queue(maxsize=self.queue_limit)
+        self._task = asyncio.create_task(self._run(), name="invalidation-bus")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._outgoing = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "connected": self.connected,
+            "pending": self._outgoing.qsize() if self._outgoing is not None else 0,
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+        }
+
+    async def _run(self) -> None:
+        delay = 1.0
+        pending: Optional[str] = None
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+                logger.warning("Invalidation bus cannot connect, retrying in %.0fs: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                continue
+
+            try:
+                await connection.add_listener(self.channel, self._receive)
+                self._reset_all()
+                self.connected = True
+                delay = 1.0
+                while True:
+                    if pending is None:
+                        try:
+                            pending = await asyncio.wait_for(self._outgoing.get(), self.keepalive)
+                        except asyncio.TimeoutError:
+                            # Idle: make sure the listening connection is still alive
+                            await connection.execute("SELECT 1")
+                            continue
+                    await connection.execute("SELECT pg_notify($1, $2)", self.channel, pending)
+                    pending = None
+                    self.sent += 1
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning("Invalidation bus connection lost: %s", e)
+                self.reconnects += 1
+            finally:
+                self.connected = False
+                connection.terminate()
+
+    def _receive(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("o") == self.origin:
+            return
+        subscription = self._subscriptions.get(message.get("t"))
+        if subscription is not None:
+            self.received += 1
+            subscription[0](message.get("k"))
+
+    def _reset_all(self) -> None:
+        for _, reset in self._subscriptions.values():
+            reset()
+
+
+invalidation_bus = InvalidationBus(
+    database_url=settings.database_url,
+    channel=settings.invalidation_channel,
+    queue_limit=settings.invalidation_queue_limit,
+    keepalive=settings.invalidation_keepalive_seconds,
+)
+
+availability_index.on_invalidate = invalidation_bus.subscribe(
+    AVAILABILITY,
+    lambda doctor_id: availability_index.invalidate(int(doctor_id), broadcast=False),
+    availability_index.clear,
+)
+doctor_directory.on_invalidate = invalidation_bus.subscribe(
+    DOCTORS,
+    lambda _: doctor_directory.invalidate(broadcast=False),
+    lambda: doctor_directory.invalidate(broadcast=False),
+)
+_publish_slot_events = invalidation_bus.subscribe(
+    SLOT_EVENTS,
+    lambda message: slot_events.deliver(int(message["d"]), [frame.encode() for frame in message["f"]]),
+    slot_events.resync_all,
+)
+slot_events.on_publish = lambda doctor_id, frames: _publish_slot_events(
+    {"d": doctor_id, "f": [frame.decode() for frame in frames]}
+)
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import OutboxJob
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.admission_control import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[AsyncSession, dict], Awaitable[None]]
+
+# Finished jobs past the retention period are deleted in batches of this size, at most once per interval
+PURGE_BATCH = 1000
+PURGE_INTERVAL = 60.0
+
+
+class JobQueue:
+    """Drains the ``outbox_jobs`` table with a bounded pool of asyncio workers.
+
+    A dispatcher claims due jobs in batches and hands them to ``workers`` workers
+    through a bounded in-memory queue, optionally throttled to ``rate`` jobs per
+    second. The throttle limits what is claimed, not what is run, so a claimed job
+    never waits out its lease in the queue. Failed jobs are retried with
+    exponential backoff and jitter until ``max_attempts``, then marked failed.
+    Finished jobs are deleted after ``retention_seconds`` (0 keeps them). Jobs are
+    at-least-once: a handler may run again if the process dies before recording
+    the outcome.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        lease_seconds: float,
+        rate: float,
+        retention_seconds: float,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = timedelta(seconds=lease_seconds)
+        self.bucket = TokenBucket(rate, max(1, int(rate))) if rate > 0 else None
+        self.retention = timedelta(seconds=retention_seconds) if retention_seconds > 0 else None
+        self.handlers: Dict[str, JobHandler] = {}
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.in_progress = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self.handlers[kind] = handler
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def notify(self) -> None:
+        """Wakes the dispatcher after a commit that added jobs, instead of waiting for the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self.running or self.workers <= 0:
+            return
+        self._queue = asyncio.Queue(maxsize=self.batch_size)
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._dispatch(), name="job-dispatcher")]
+        self._tasks += [asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stops claiming and waits up to ``timeout`` for running jobs; unfinished ones are re-run after their lease."""
+        if not self.running:
+            return
+        dispatcher, workers = self._tasks[0], self._tasks[1:]
+        dispatcher.cancel()
+        await asyncio.gather(dispatcher, return_exceptions=True)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Job queue stopped with %d jobs unfinished", self.queued + self.in_progress)
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._wakeup = None
+
+    async def _dispatch(self) -> None:
+        while True:
+            await self._maybe_purge()
+            # Claim only what the workers can take now, and the throttle lets start now;
+            # the rest stays in the outbox
+            capacity = self._queue.maxsize - self._queue.qsize()
+            if capacity > 0 and self.bucket is not None:
+                capacity = await self._throttle(capacity)
+            try:
+                jobs = await self._claim(capacity) if capacity > 0 else []
+            except Exception:
+                logger.exception("Claiming outbox jobs failed")
+                jobs = []
+            if self.bucket is not None and len(jobs) < capacity:
+                self.bucket.give_back(capacity - len(jobs))
+            for job in jobs:
+                await self._queue.put(job)
+            if not jobs or len(jobs) < capacity:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _throttle(self, limit: int) -> int:
+        """Takes up to ``limit`` throttle tokens, waiting for the first; returns how many were taken."""
+        while wait := self.bucket.take(time.monotonic()):
+            await asyncio.sleep(wait)
+        taken = 1
+        while taken < limit and not self.bucket.take(time.monotonic()):
+            taken += 1
+        return taken
+
+    async def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if self.retention is None or now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        try:
+            async with AsyncSessionLocal() as session:
+                deleted = await OutboxRepository(session).purge_done(self.retention, PURGE_BATCH)
+        except Exception:
+            logger.exception("Purging finished outbox jobs failed")
+            return
+        if deleted:
+            logger.debug("Purged %d finished outbox jobs", deleted)
+
+    async def _claim(self, limit: int) -> List[OutboxJob]:
+        async with AsyncSessionLocal() as session:
+            return await OutboxRepository(session).claim_due(limit, self.lease)
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            self.in_progress += 1
+            try:
+                await self._run(job)
+            except Exception:
+                logger.exception("Recording the outcome of job %s failed", job.id)
+            finally:
+                self.in_progress -= 1
+                self._queue.task_done()
+
+    async def _run(self, job: OutboxJob) -> None:
+        handler = self.handlers.get(job.kind)
+        async with AsyncSessionLocal() as session:
+            try:
+                if handler is None:
+                    raise LookupError(f"No handler registered for job kind {job.kind!r}")
+                await handler(session, job.payload)
+            except Exception as e:
+                await session.rollback()
+                retry_at = self._retry_at(job) if handler is not None else None
+                logger.warning("Job %s (%s) attempt %d failed: %s", job.id, job.kind, job.attempts, e)
+                await OutboxRepository(session).fail(job.id, repr(e), retry_at)
+                if retry_at is None:
+                    self.failed += 1
+                else:
+                    self.retried += 1
+                return
+            await OutboxRepository(session).complete(job.id)
+            self.completed += 1
+
+    def _retry_at(self, job: OutboxJob) -> Optional[datetime]:
+        if job.attempts >= self.max_attempts:
+            return None
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1))
+        return datetime.now(timezone.utc) + timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "in_progress": self.in_progress,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+job_queue = JobQueue(
+    workers=settings.job_queue_workers,
+    batch_size=settings.job_queue_batch_size,
+    poll_interval=settings.job_queue_poll_interval,
+    max_attempts=settings.job_queue_max_attempts,
+    backoff_base=settings.job_queue_backoff_base,
+    backoff_max=settings.job_queue_backoff_max,
+    lease_seconds=settings.job_queue_lease_seconds,
+    rate=settings.job_queue_rate,
+    retention_seconds=settings.job_queue_retention_seconds,
+)
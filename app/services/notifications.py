@@ -0,0 +1,78 @@
+import logging
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.models import Appointment, User
+from app.services.job_queue import job_queue
+
+logger = logging.getLogger(__name__)
+
+# Outbox job kinds
+PASSWORD_RESET = "password_reset_email"
+BOOKING_CONFIRMATION = "booking_confirmation_email"
+CANCELLATION_NOTICE = "cancellation_notice_email"
+
+
+async def send_email(to: str, subject: str, body: str) -> None:
+    """Delivers an email. No mail provider is configured yet, so only the recipient and subject are logged.
+
+    Bodies can carry secrets (e.g. password reset tokens), so they are never logged.
+    """
+    logger.info("Email to %s: %s (%d characters, not delivered)", to, subject, len(body))
+
+
+async def send_password_reset(session: AsyncSession, payload: dict) -> None:
+    from app.services.auth_service import PASSWORD_RESET_EXPIRE_MINUTES, AuthService
+
+    user = await session.get(User, payload["user_id"])
+    if user is None:
+        return
+    token = AuthService.create_password_reset_token(user)
+    await send_email(
+        user.email,
+        "Reset your password",
+        f"Use this code with POST /auth/reset-password within {PASSWORD_RESET_EXPIRE_MINUTES} minutes: {token}",
+    )
+
+
+async def _load_appointment(session: AsyncSession, appointment_id: int):
+    result = await session.execute(
+        select(Appointment)
+        .where(Appointment.id == appointment_id)
+        .options(joinedload(Appointment.doctor), joinedload(Appointment.patient))
+    )
+    return result.scalar_one_or_none()
+
+
+async def send_booking_confirmation(session: AsyncSession, payload: dict) -> None:
+    appointment = await _load_appointment(session, payload["appointment_id"])
+    if appointment is None:
+        return
+    await send_email(
+        appointment.patient.email,
+        "Appointment confirmed",
+        f"Your appointment with {appointment.doctor.name} on "
+        f"{appointment.appointment_time.isoformat()} is confirmed.",
+    )
+
+
+async def send_cancellation_notice(session: AsyncSession, payload: dict) -> None:
+    appointment = await _load_appointment(session, payload["appointment_id"])
+    if appointment is None:
+        return
+    when = appointment.appointment_time.isoformat()
+    await send_email(
+        appointment.patient.email,
+        "Appointment cancelled",
+        f"Your appointment with {appointment.doctor.name} on {when} has been cancelled.",
+    )
+    await send_email(
+        appointment.doctor.email,
+        "Appointment cancelled",
+        f"The appointment with {appointment.patient.name} on {when} has been cancelled.",
+    )
+
+
+job_queue.register(PASSWORD_RESET, send_password_reset)
+job_queue.register(BOOKING_CONFIRMATION, send_booking_confirmation)
+job_queue.register(CANCELLATION_NOTICE, send_cancellation_notice)
@@ -0,0 +1,79 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+from passlib.context import CryptContext
+from app.config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password executor's queue is full."""
+
+
+class PasswordHasher:
+    """Runs bcrypt work on a bounded executor so it never blocks the event loop.
+
+    At most ``max_workers`` hashes run at once and at most ``queue_limit`` more wait
+    for a worker; anything beyond that is rejected with ``PasswordHasherBusy``.
+    ``max_workers=0`` runs the work inline on the event loop.
+    """
+
+    def __init__(self, max_workers: int, queue_limit: int, use_processes: bool = False):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.use_processes = use_processes
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hasher"
+                )
+        return self._executor
+
+    async def _run(self, func: Callable, *args):
+        if self.max_workers <= 0:
+            return func(*args)
+
+        if self.in_flight >= self.max_workers + self.queue_limit:
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many password operations in progress")
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.password_hash_workers,
+    queue_limit=settings.password_hash_queue_limit,
+    use_processes=settings.password_hash_executor == "process",
+)
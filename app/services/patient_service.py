@@ -1,80 +1,244 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
 from app.repositories.user_repository import UserRepository
 from app.repositories.availability_repository import AvailabilityRepository
 from app.repositories.appointment_repository import AppointmentRepository
-from app.models import User, Availability, Appointment
-from app.schemas import AppointmentCreate
+from app.models import User, UserRole, Availability, Appointment
+from app.schemas import (
+    AppointmentChange, AppointmentChanges, AppointmentCreate, AppointmentResponse,
+    AvailabilityChange, AvailabilityChanges, BulkAppointmentResult, BulkItemResult
+)
+from app.pagination import PageRequest
+from app.config import settings
+from app.slot_events import TooManySubscribers, slot_events
+from app.availability_index import AvailabilitySlot
+from app.services.doctor_directory import DirectoryPage, doctor_directory, etag_for, serialize_doctors
+from app.services.job_queue import job_queue
+from app.services.notifications import BOOKING_CONFIRMATION, CANCELLATION_NOTICE
 
 
 class PatientService:
     def __init__(self, session: AsyncSession):
+        self.session = session
         self.user_repo = UserRepository(session)
         self.availability_repo = AvailabilityRepository(session)
         self.appointment_repo = AppointmentRepository(session)
 
-    async def list_doctors(self) -> List[User]:
-        return await self.user_repo.get_doctors()
+    async def list_doctors(self, page: Optional[PageRequest] = None) -> List[User]:
+        return await self.user_repo.get_doctors(page)
+
+    async def get_doctor_directory(self, page: PageRequest) -> DirectoryPage:
+        """A serialized page of doctors, served from the directory cache when possible."""
+        key = (page.limit, page.after, page.start, page.end)
+        cached = doctor_directory.get(key)
+        if cached is not None:
+            return cached
+
+        version = doctor_directory.version
+        doctors = await self.user_repo.get_doctors(page)
+        body = serialize_doctors(doctors)
+        directory_page = DirectoryPage(
+            body=body,
+            etag=etag_for(body),
+            next_cursor=page.next_cursor(doctors, lambda doctor: (doctor.id,)),
+        )
+        doctor_directory.put(key, directory_page, version)
+        return directory_page
+
+    async def get_doctor_availability(
+        self, doctor_id: int, page: Optional[PageRequest] = None
+    ) -> List[AvailabilitySlot]:
+        availabilities = await self.availability_repo.get_by_doctor_id(doctor_id, page)
+
+        # Only an empty result needs the doctor lookup to tell "no slots" from "no doctor"
+        if not availabilities:
+            doctor = await self.user_repo.get_by_id(doctor_id)
+            if not doctor:
+                raise ValueError("Doctor not found")
+
+        return availabilities
+
+    async def get_availability_changes(self, doctor_id: int, page: PageRequest) -> AvailabilityChanges:
+        """The doctor's windows created, opened or closed since the page's delta-sync cursor."""
+        availabilities = await self.availability_repo.get_changes(doctor_id, page)
+        if not availabilities and page.after is None:
+            doctor = await self.user_repo.get_by_id(doctor_id)
+            if not doctor:
+                raise ValueError("Doctor not found")
+
+        return AvailabilityChanges(
+            changes=[AvailabilityChange.model_validate(availability) for availability in availabilities],
+            cursor=page.changes_cursor(availabilities),
+            has_more=len(availabilities) == page.limit,
+        )
+
+    async def get_appointment_changes(self, user_id: int, role: str, page: PageRequest) -> AppointmentChanges:
+        """The user's appointments created, updated or cancelled since the page's delta-sync cursor."""
+        if role == UserRole.DOCTOR.value:
+            appointments = await self.appointment_repo.get_changes(page, doctor_id=user_id)
+        else:
+            appointments = await self.appointment_repo.get_changes(page, patient_id=user_id)
+
+        return AppointmentChanges(
+            changes=[AppointmentChange.model_validate(appointment) for appointment in appointments],
+            cursor=page.changes_cursor(appointments),
+            has_more=len(appointments) == page.limit,
+        )
 
-    async def get_doctor_availability(self, doctor_id: int) -> List[Availability]:
-        # Verify doctor exists
+    async def watch_doctor_availability(self, doctor_id: int) -> AsyncIterator[bytes]:
+        """Server-Sent Events stream of the doctor's slot changes; raises before streaming if it cannot be served."""
         doctor = await self.user_repo.get_by_id(doctor_id)
+        # The stream never touches the database: end the transaction and return the
+        # connection to the pool now rather than when the request's session is torn down
+        await self.session.close()
         if not doctor:
             raise ValueError("Doctor not found")
-
-        return await self.availability_repo.get_by_doctor_id(doctor_id)
+        if not slot_events.has_capacity:
+            raise TooManySubscribers()
+        return slot_events.stream(doctor_id, settings.slot_events_heartbeat_seconds)
+
+    async def find_next_available(self, page: PageRequest) -> List[AvailabilitySlot]:
+        """Open slots with any doctor, earliest free time first; the search starts now unless ``from`` is given."""
+        if page.start is None:
+            page.start = datetime.now(timezone.utc)
+        elif page.start.tzinfo is None:
+            page.start = page.start.replace(tzinfo=timezone.utc)
+        return await self.availability_repo.get_next_open(page)
 
     async def book_appointment(self, patient_id: int, appointment_data: AppointmentCreate) -> Appointment:
-        # Verify doctor exists
+        appointment = await self.appointment_repo.book(
+            doctor_id=appointment_data.doctor_id,
+            patient_id=patient_id,
+            availability_id=appointment_data.availability_id,
+            appointment_time=appointment_data.appointment_time,
+            end_time=self._requested_end(appointment_data),
+            outbox_kind=BOOKING_CONFIRMATION
+        )
+        if appointment is None:
+            raise ValueError(await self._booking_failure_reason(appointment_data))
+
+        job_queue.notify()
+        return appointment
+
+    async def _booking_failure_reason(self, appointment_data: AppointmentCreate) -> str:
+        """Works out why a booking was rejected; only runs on the failure path."""
         doctor = await self.user_repo.get_by_id(appointment_data.doctor_id)
         if not doctor:
-            raise ValueError("Doctor not found")
+            return "Doctor not found"
 
-        # Verify availability exists and is available
         availability = await self.availability_repo.get_by_id(appointment_data.availability_id)
         if not availability:
-            raise ValueError("Availability not found")
+            return "Availability not found"
 
         if not availability.is_available:
-            raise ValueError("This time slot is no longer available")
+            return "This time slot is no longer available"
 
         if availability.doctor_id != appointment_data.doctor_id:
-            raise ValueError("Availability does not belong to this doctor")
+            return "Availability does not belong to this doctor"
 
-        # Check if appointment time is within availability window
-        if not (availability.start_time <= appointment_data.appointment_time <= availability.end_time):
-            raise ValueError("Appointment time must be within availability window")
+        if not self._fits_window(appointment_data, availability):
+            return "Appointment time must be within availability window"
 
-        # Check for double-booking
-        has_conflict = await self.appointment_repo.check_conflict(
-            appointment_data.doctor_id,
-            appointment_data.appointment_time,
-            appointment_data.availability_id
-        )
-        if has_conflict:
-            raise ValueError("This time slot is already booked")
+        return "This time overlaps an existing appointment"
 
-        # Create appointment and mark availability as unavailable
-        appointment = await self.appointment_repo.create(
-            doctor_id=appointment_data.doctor_id,
-            patient_id=patient_id,
-            availability_id=appointment_data.availability_id,
-            appointment_time=appointment_data.appointment_time
-        )
+    @staticmethod
+    def _requested_end(appointment_data: AppointmentCreate) -> Optional[datetime]:
+        """End of the requested appointment, or None for the rest of the availability window."""
+        if appointment_data.duration_minutes is None:
+            return None
+        return appointment_data.appointment_time + timedelta(minutes=appointment_data.duration_minutes)
 
-        # Mark availability as unavailable
-        await self.availability_repo.mark_unavailable(appointment_data.availability_id)
-
-        return appointment
+    def _fits_window(self, appointment_data: AppointmentCreate, availability: Availability) -> bool:
+        end_time = self._requested_end(appointment_data) or availability.end_time
+        return availability.start_time <= appointment_data.appointment_time < end_time <= availability.end_time
 
     async def cancel_appointment(self, appointment_id: int, patient_id: int) -> Appointment:
-        appointment = await self.appointment_repo.cancel(appointment_id, patient_id, "Patient")
+        appointment = await self.appointment_repo.cancel(
+            appointment_id, patient_id, "Patient", outbox_kind=CANCELLATION_NOTICE
+        )
         if not appointment:
-            raise ValueError("Appointment not found or you don't have permission to cancel it")
-
-        # Mark availability as available again
-        await self.availability_repo.mark_available(appointment.availability_id)
-
+            raise ValueError("Appointment not found, not scheduled, or you don't have permission to cancel it")
+        job_queue.notify()
         return appointment
 
+    async def book_appointments(
+        self, patient_id: int, bookings: List[AppointmentCreate]
+    ) -> BulkAppointmentResult:
+        """Books a batch in one transaction, reporting success or failure per item."""
+        availabilities = await self.availability_repo.lock_many([b.availability_id for b in bookings])
+
+        # Every scheduled appointment the batch could collide with, in one query
+        taken = {}
+        if availabilities:
+            taken = await self.appointment_repo.get_scheduled_ranges(
+                {availability.doctor_id for availability in availabilities.values()},
+                min(availability.start_time for availability in availabilities.values()),
+                max(availability.end_time for availability in availabilities.values()),
+            )
+
+        outcomes: List[Union[int, str]] = []  # position in ``valid`` or an error message
+        valid: List[Tuple[Availability, datetime, datetime]] = []
+        for booking in bookings:
+            availability = availabilities.get(booking.availability_id)
+            if not availability:
+                outcomes.append("Availability not found")
+            elif not availability.is_available:
+                outcomes.append("This time slot is no longer available")
+            elif availability.doctor_id != booking.doctor_id:
+                outcomes.append("Availability does not belong to this doctor")
+            elif not self._fits_window(booking, availability):
+                outcomes.append("Appointment time must be within availability window")
+            else:
+                start, end = booking.appointment_time, self._requested_end(booking) or availability.end_time
+                doctor_ranges = taken.setdefault(availability.doctor_id, [])
+                if any(start < taken_end and taken_start < end for taken_start, taken_end in doctor_ranges):
+                    outcomes.append("This time overlaps an existing appointment")
+                else:
+                    doctor_ranges.append((start, end))
+                    outcomes.append(len(valid))
+                    valid.append((availability, start, end))
+
+        appointments = await self.appointment_repo.create_many(patient_id, valid, outbox_kind=BOOKING_CONFIRMATION)
+        if any(appointments):
+            job_queue.notify()
+        # A None lost a race with a booking in an overlapping window
+        return self._bulk_result([
+            outcome if isinstance(outcome, str)
+            else appointments[outcome] or "This time overlaps an existing appointment"
+            for outcome in outcomes
+        ])
+
+    async def cancel_appointments(self, patient_id: int, appointment_ids: List[int]) -> BulkAppointmentResult:
+        """Cancels a batch in one transaction, reporting success or failure per item."""
+        appointments = await self.appointment_repo.lock_many(appointment_ids)
+
+        outcomes: List[Union[Appointment, str]] = []
+        valid: List[Appointment] = []
+        seen = set()
+        for appointment_id in appointment_ids:
+            appointment = appointments.get(appointment_id)
+            if not appointment or appointment.patient_id != patient_id:
+                outcomes.append("Appointment not found or you don't have permission to cancel it")
+            elif appointment.status != "scheduled" or appointment_id in seen:
+                outcomes.append("Appointment is not scheduled")
+            else:
+                seen.add(appointment_id)
+                outcomes.append(appointment)
+                valid.append(appointment)
+
+        await self.appointment_repo.cancel_many(valid, outbox_kind=CANCELLATION_NOTICE)
+        if valid:
+            job_queue.notify()
+        return self._bulk_result(outcomes)
+
+    @staticmethod
+    def _bulk_result(outcomes: List[Union[Appointment, str]]) -> BulkAppointmentResult:
+        results = [
+            BulkItemResult(index=index, success=False, error=outcome)
+            if isinstance(outcome, str)
+            else BulkItemResult(index=index, success=True, appointment=AppointmentResponse.model_validate(outcome))
+            for index, outcome in enumerate(outcomes)
+        ]
+        succeeded = sum(result.success for result in results)
+        return BulkAppointmentResult(succeeded=succeeded, failed=len(results) - succeeded, results=results)
@@ -0,0 +1,67 @@
+import heapq
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from app.config import settings
+from app.schemas import TokenData
+
+
+class TokenCache:
+    """Bounded LRU of already-verified JWTs.
+
+    Each entry is dropped at its token's ``exp`` claim, so a cached token is never
+    accepted after it would have failed ``jwt.decode``. When the cache is full the
+    least recently used token is evicted. ``max_size=0`` disables caching.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, TokenData]]" = OrderedDict()
+        self._expiries: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[TokenData]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        expires_at, token_data = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return token_data
+
+    def put(self, token: str, token_data: TokenData, expires_at: float) -> None:
+        if self.max_size <= 0:
+            return
+        now = time.time()
+        if expires_at <= now:
+            return
+        self._evict_expired(now)
+
+        self._entries[token] = (expires_at, token_data)
+        self._entries.move_to_end(token)
+        heapq.heappush(self._expiries, (expires_at, token))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+        # Entries evicted by LRU leave stale heap items behind; rebuild before it grows unbounded
+        if len(self._expiries) > 2 * self.max_size:
+            self._expiries = [(expires, key) for key, (expires, _) in self._entries.items()]
+            heapq.heapify(self._expiries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._expiries.clear()
+
+    def _evict_expired(self, now: float) -> None:
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, token = heapq.heappop(self._expiries)
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[token]
+
+
+token_cache = TokenCache(max_size=settings.token_cache_size)
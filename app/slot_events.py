@@ -0,0 +1,172 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, Iterable, List, Optional, Set
+from app.config import settings
+from app.schemas import AvailabilityResponse
+
+SLOT_OPENED = "slot_opened"
+SLOT_CLOSED = "slot_closed"
+RESYNC = "resync"
+
+# Larger batches are relayed to other workers as a single resync (NOTIFY payloads are capped at
+# 8000 bytes; the byte limit leaves room for the frames' JSON escaping)
+MAX_RELAY_WINDOWS = 16
+MAX_RELAY_BYTES = 5000
+
+
+def format_event(event: str, data: str) -> bytes:
+    return f"event: {event}\ndata: {data}\n\n".encode()
+
+
+RESYNC_FRAME = format_event(RESYNC, "{}")
+HEARTBEAT_FRAME = b": keepalive\n\n"
+
+
+class TooManySubscribers(Exception):
+    """Raised when this worker already serves ``max_subscribers`` event streams."""
+
+
+class SlotSubscription:
+    """One watcher's bounded backlog of encoded Server-Sent Events frames.
+
+    A watcher that falls more than ``max_pending`` frames behind loses its backlog
+    and gets a single ``resync`` event instead, so a slow client never holds more
+    than ``max_pending`` frames in memory or slows the publisher down.
+    """
+
+    def __init__(self, doctor_id: int, max_pending: int):
+        self.doctor_id = doctor_id
+        self.max_pending = max_pending
+        self._frames: Deque[bytes] = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, frames: List[bytes]) -> bool:
+        """Queues ``frames``; returns False if the backlog overflowed and was replaced by a resync."""
+        overflowed = len(self._frames) + len(frames) > self.max_pending
+        if overflowed:
+            self._frames.clear()
+            self._frames.append(RESYNC_FRAME)
+        else:
+            self._frames.extend(frames)
+        self._ready.set()
+        return not overflowed
+
+    async def next(self, timeout: float) -> Optional[bytes]:
+        """Every pending frame, or None if nothing arrives within ``timeout`` seconds."""
+        if not self._frames:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        frames = b"".join(self._frames)
+        self._frames.clear()
+        return frames
+
+
+class SlotEventHub:
+    """In-process pub/sub of availability changes, keyed by doctor.
+
+    Repositories call ``publish_windows`` after committing writes that create,
+    open or close windows. Each change is encoded once and appended to every
+    watcher's backlog, so a change costs the same however many clients watch and
+    watchers never query the database. ``on_publish``, when set, is called with
+    each doctor's frames so other worker processes can deliver them too.
+    """
+
+    def __init__(self, max_pending: int, max_subscribers: int):
+        self.max_pending = max_pending
+        self.max_subscribers = max_subscribers
+        self.subscriber_count = 0
+        self.published = 0
+        self.overflows = 0
+        self.on_publish: Optional[Callable[[int, List[bytes]], None]] = None
+        self._subscribers: Dict[int, Set[SlotSubscription]] = {}
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.subscriber_count < self.max_subscribers
+
+    def subscribe(self, doctor_id: int) -> SlotSubscription:
+        if not self.has_capacity:
+            raise TooManySubscribers()
+        subscription = SlotSubscription(doctor_id, self.max_pending)
+        self._subscribers.setdefault(doctor_id, set()).add(subscription)
+        self.subscriber_count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: SlotSubscription) -> None:
+        watchers = self._subscribers.get(subscription.doctor_id)
+        if watchers is None or subscription not in watchers:
+            return
+        watchers.discard(subscription)
+        self.subscriber_count -= 1
+        if not watchers:
+            del self._subscribers[subscription.doctor_id]
+
+    def publish_windows(self, windows: Iterable) -> None:
+        """Publishes the current state of each window: ``slot_opened`` if it is available, else ``slot_closed``.
+
+        Windows must carry their ``free_ranges`` (see ``availability_index.snapshot``),
+        so a partly booked window is published as open with its remaining gaps.
+        """
+        by_doctor: Dict[int, list] = {}
+        for window in windows:
+            by_doctor.setdefault(window.doctor_id, []).append(window)
+        for doctor_id, doctor_windows in by_doctor.items():
+            watched = doctor_id in self._subscribers
+            relayed = self.on_publish is not None
+            if not watched and not (relayed and len(doctor_windows) <= MAX_RELAY_WINDOWS):
+                if relayed:
+                    self.on_publish(doctor_id, [RESYNC_FRAME])
+                continue
+            frames = [
+                format_event(
+                    SLOT_OPENED if window.is_available else SLOT_CLOSED,
+                    AvailabilityResponse.model_validate(window).model_dump_json(),
+                )
+                for window in doctor_windows
+            ]
+            if watched:
+                self.deliver(doctor_id, frames)
+            if relayed:
+                fits = len(frames) <= MAX_RELAY_WINDOWS and sum(map(len, frames)) <= MAX_RELAY_BYTES
+                self.on_publish(doctor_id, frames if fits else [RESYNC_FRAME])
+
+    def deliver(self, doctor_id: int, frames: List[bytes]) -> None:
+        """Appends already-encoded frames to this process's watchers of ``doctor_id``."""
+        self.published += 1
+        for subscription in self._subscribers.get(doctor_id, ()):
+            if not subscription.push(frames):
+                self.overflows += 1
+
+    def resync_all(self) -> None:
+        """Tells every local watcher to refetch, e.g. after events may have been missed."""
+        for watchers in self._subscribers.values():
+            for subscription in watchers:
+                subscription.push([RESYNC_FRAME])
+
+    async def stream(self, doctor_id: int, heartbeat: float) -> AsyncIterator[bytes]:
+        """Server-Sent Events for one watcher, with a comment line every ``heartbeat`` idle seconds."""
+        subscription = self.subscribe(doctor_id)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                frames = await subscription.next(heartbeat)
+                yield HEARTBEAT_FRAME if frames is None else frames
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.subscriber_count,
+            "doctors_watched": len(self._subscribers),
+            "published": self.published,
+            "overflows": self.overflows,
+        }
+
+
+slot_events = SlotEventHub(
+    max_pending=settings.slot_events_queue_size,
+    max_subscribers=settings.slot_events_max_subscribers,
+)
@@ -0,0 +1,127 @@
+"""Shared helpers for the benchmark scripts: latency recording, reporting and JSON results."""
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def disable_auth_rate_limits() -> None:
+    """Turns the auth rate limits off for an in-process app imported after this call.
+
+    Every simulated user reaches the app from the same client address, so the rate
+    limits would throttle the harness itself; the concurrency limit stays on.
+    Explicit AUTH_CLIENT_RATE / AUTH_GLOBAL_RATE settings are kept.
+    """
+    os.environ.setdefault("AUTH_CLIENT_RATE", "0")
+    os.environ.setdefault("AUTH_GLOBAL_RATE", "0")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LatencyRecorder:
+    """Collects per-route latencies (in seconds) and error counts."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+
+    def stop(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    def record(self, route: str, elapsed: float, ok: bool = True) -> None:
+        self.samples[route].append(elapsed)
+        if not ok:
+            self.errors[route] += 1
+
+    @property
+    def wall_time(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def summary(self) -> Dict[str, dict]:
+        wall = self.wall_time or 1e-9
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            routes[route] = {
+                "count": len(samples),
+                "errors": self.errors.get(route, 0),
+                "throughput_rps": round(len(samples) / wall, 2),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+                "p50_ms": round(percentile(samples, 50) * 1000, 3),
+                "p95_ms": round(percentile(samples, 95) * 1000, 3),
+                "p99_ms": round(percentile(samples, 99) * 1000, 3),
+                "max_ms": round(max(samples) * 1000, 3),
+            }
+        return routes
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(name: str, parameters: dict, results: dict) -> dict:
+    return {
+        "benchmark": name,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "parameters": parameters,
+        "results": results,
+    }
+
+
+def write_report(report: dict, output: Optional[str]) -> None:
+    if not output:
+        return
+    path = Path(output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, default=str))
+    print(f"\nResults written to {path}")
+
+
+def print_route_table(routes: Dict[str, dict], baseline: Optional[Dict[str, dict]] = None) -> None:
+    header = f"{'route':<42} {'count':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for route, stats in routes.items():
+        line = (
+            f"{route:<42} {stats['count']:>7} {stats['errors']:>5} {stats['throughput_rps']:>9.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+        if baseline and route in baseline:
+            before = baseline[route]["p95_ms"]
+            if before:
+                change = (stats["p95_ms"] - before) / before * 100
+                line += f"   p95 {change:+.1f}% vs baseline"
+        print(line)
+
+
+def load_baseline(path: Optional[str]) -> Optional[Dict[str, dict]]:
+    if not path:
+        return None
+    return json.loads(Path(path).read_text())["results"]["routes"]
@@ -0,0 +1,126 @@
+"""Cost of encoding large list responses: the response_model path versus the fast path.
+
+Builds N in-memory appointments (with their doctor and patient loaded) and encodes them
+as ``List[AppointmentResponse]`` and ``List[AppointmentWithDetails]`` two ways:
+
+* ``response_model``: what FastAPI does for a route returning ORM objects; validate
+  with ``from_attributes``, dump to JSON-compatible Python, then ``json.dumps``.
+* ``fast``: ``app.serialization`` (``FAST_JSON_RESPONSES=true``), which reads the
+  schema fields straight off the rows and encodes them with orjson when installed.
+
+No database is touched, but the app settings must load (``.env`` or ``DATABASE_URL``
+and ``SECRET_KEY``). Exits non-zero if the two paths produce different JSON.
+
+    python -m benchmarks.serialization --sizes 1000 10000 --output bench/serialization.json
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from benchmarks.common import build_report, percentile, write_report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Rows per response")
+    parser.add_argument("--repeat", type=int, default=20, help="Encodings timed per size and path")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    return parser.parse_args(argv)
+
+
+def build_appointments(count: int) -> list:
+    from app.models import Appointment, User, UserRole
+
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    doctor = User(id=1, email="doctor@bench.example.com", password_hash="x", role=UserRole.DOCTOR,
+                  name="Bench Doctor", created_at=created)
+    patient = User(id=2, email="patient@bench.example.com", password_hash="x", role=UserRole.PATIENT,
+                   name="Bench Patient", created_at=created)
+    return [
+        Appointment(id=i, doctor_id=doctor.id, patient_id=patient.id, availability_id=i,
+                    appointment_time=created + timedelta(minutes=30 * i),
+                    end_time=created + timedelta(minutes=30 * (i + 1)), status="scheduled",
+                    created_at=created, doctor=doctor, patient=patient)
+        for i in range(1, count + 1)
+    ]
+
+
+def response_model_path(schema):
+    """Mirrors FastAPI's serialize_response followed by JSONResponse.render."""
+    from pydantic import TypeAdapter
+
+    adapter = TypeAdapter(List[schema])
+
+    def encode(rows: list) -> bytes:
+        content = adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                          separators=(",", ":")).encode("utf-8")
+
+    return encode
+
+
+def fast_path(schema):
+    from app.serialization import dump_rows, encode_json
+
+    return lambda rows: encode_json(dump_rows(rows, schema))
+
+
+def time_encoder(encode, rows: list, repeat: int) -> dict:
+    encode(rows)  # warm up
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode(rows)
+        samples.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    from app.schemas import AppointmentResponse, AppointmentWithDetails
+    from app.serialization import orjson
+
+    results = {"encoder": "orjson" if orjson is not None else "pydantic-core", "sizes": {}, "mismatches": []}
+    for size in args.sizes:
+        rows = build_appointments(size)
+        by_schema = {}
+        for schema in (AppointmentResponse, AppointmentWithDetails):
+            baseline, fast = response_model_path(schema), fast_path(schema)
+            if json.loads(baseline(rows)) != json.loads(fast(rows)):
+                results["mismatches"].append(f"{schema.__name__} x {size}")
+            by_schema[schema.__name__] = {
+                "response_model": time_encoder(baseline, rows, args.repeat),
+                "fast": time_encoder(fast, rows, args.repeat),
+            }
+        results["sizes"][size] = by_schema
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = run(args)
+
+    print(f"encoder: {results['encoder']}")
+    header = f"{'schema':<24} {'rows':>7} {'model p50 ms':>13} {'fast p50 ms':>12} {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    for size, by_schema in results["sizes"].items():
+        for schema, paths in by_schema.items():
+            before, after = paths["response_model"]["p50_ms"], paths["fast"]["p50_ms"]
+            speedup = before / after if after else float("inf")
+            print(f"{schema:<24} {size:>7} {before:>13.2f} {after:>12.2f} {speedup:>7.1f}x")
+    for mismatch in results["mismatches"]:
+        print(f"FAIL output differs for {mismatch}")
+
+    write_report(build_report("serialization", {"sizes": args.sizes, "repeat": args.repeat}, results), args.output)
+    return 1 if results["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,24 @@
 #!/bin/bash
+#
+# Usage: ./run.sh [dev|prod]
+#
+#   dev   (default) start the docker-compose database and a single auto-reloading server
+#   prod  run migrations, then serve with WEB_CONCURRENCY worker processes
+#
+# prod settings (environment variables):
+#   WEB_CONCURRENCY    worker processes (default: number of CPUs)
+#   HOST, PORT         bind address (default 0.0.0.0:8000)
+#   GRACEFUL_TIMEOUT   seconds a stopping worker gets to finish in-flight requests (default 30)
+#   MAX_REQUESTS       recycle a worker after this many requests, gunicorn only (default 0, never)
+#
+# With gunicorn installed, `kill -HUP <master pid>` replaces the workers one by one
+# without dropping connections; otherwise uvicorn's own supervisor is used.
+
+MODE=${1:-dev}
+case "$MODE" in
+    dev|prod) ;;
+    *) echo "Usage: $0 [dev|prod]"; exit 1 ;;
+esac
 
 # Check if .env file exists
 if [ ! -f .env ]; then
@@ -7,15 +27,46 @@ if [ ! -f .env ]; then
     echo "Please edit .env file with your configuration"
 fi
 
-# Start database
-echo "Starting PostgreSQL database..."
-docker-compose up -d
+if [ "$MODE" = "dev" ]; then
+    # Start database
+    echo "Starting PostgreSQL database..."
+    docker-compose up -d
+
+    # Wait for database to be ready
+    echo "Waiting for database to be ready..."
+    sleep 5
+fi
+
+# Bring the schema up to date; the app refuses to start on an old revision
+echo "Applying database migrations..."
+alembic upgrade head || exit 1
 
-# Wait for database to be ready
-echo "Waiting for database to be ready..."
-sleep 5
+if [ "$MODE" = "dev" ]; then
+    # Run the application
+    echo "Starting FastAPI application..."
+    exec uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+fi
 
-# Run the application
-echo "Starting FastAPI application..."
-uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+WORKERS=${WEB_CONCURRENCY:-$(nproc 2>/dev/null || echo 2)}
+HOST=${HOST:-0.0.0.0}
+PORT=${PORT:-8000}
+GRACEFUL_TIMEOUT=${GRACEFUL_TIMEOUT:-30}
+MAX_REQUESTS=${MAX_REQUESTS:-0}
 
+# Workers are forked without --preload so each one opens its own database pools
+echo "Starting FastAPI application with $WORKERS workers on $HOST:$PORT..."
+if command -v gunicorn >/dev/null 2>&1; then
+    exec gunicorn app.main:app \
+        --worker-class uvicorn.workers.UvicornWorker \
+        --workers "$WORKERS" \
+        --bind "$HOST:$PORT" \
+        --graceful-timeout "$GRACEFUL_TIMEOUT" \
+        --max-requests "$MAX_REQUESTS" \
+        --max-requests-jitter $((MAX_REQUESTS / 10))
+else
+    exec uvicorn app.main:app \
+        --host "$HOST" \
+        --port "$PORT" \
+        --workers "$WORKERS" \
+        --timeout-graceful-shutdown "$GRACEFUL_TIMEOUT"
+fi
@@ -0,0 +1,13 @@
+"""Concurrent bookings of the same slots never double-book (see benchmarks.booking_stress)."""
+import argparse
+import random
+
+
+async def test_racing_patients_book_each_slot_once(database):
+    from benchmarks.booking_stress import current_book, run_phase
+
+    args = argparse.Namespace(slots=20, contenders=5, concurrency=25)
+    phase = await run_phase("single_transaction", current_book, args, random.Random(1))
+
+    assert phase["double_booked_slots"] == 0
+    assert phase["booked"] == args.slots
@@ -0,0 +1,10 @@
+"""The appointment detail routes must not issue a query per row (see benchmarks.query_counts)."""
+
+
+async def test_detail_routes_issue_a_constant_number_of_queries(database):
+    from benchmarks.query_counts import measure_query_counts
+
+    counts = await measure_query_counts([1, 10, 30])
+
+    for role, by_size in counts.items():
+        assert len(set(by_size.values())) == 1, f"{role}: {by_size}"
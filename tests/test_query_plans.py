@@ -0,0 +1,25 @@
+"""The hot queries must be served by an index, never a sequential scan (see benchmarks.query_plans)."""
+import argparse
+import asyncio
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def seeded(database):
+    from app.database import engine
+    from benchmarks.query_plans import seed
+
+    async def run() -> None:
+        await seed(argparse.Namespace(doctors=20, patients=100, slots_per_doctor=200))
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+async def test_hot_queries_use_indexes(seeded):
+    from benchmarks.query_plans import explain_hot_queries
+
+    results = await explain_hot_queries(enable_seqscan=False)
+
+    assert {name: result["seq_scans"] for name, result in results.items() if not result["ok"]} == {}
@@ -0,0 +1,22 @@
+"""Startup stays within its budget (see benchmarks.cold_start)."""
+import os
+import statistics
+
+# Median cold start allowed, from process spawn to the first answered request
+COLD_START_BUDGET_MS = float(os.environ.get("COLD_START_BUDGET_MS", "2500"))
+
+
+async def test_schema_check_is_a_single_statement(database):
+    from benchmarks.cold_start import compare_startup_checks
+
+    checks = await compare_startup_checks(repeat=5)
+
+    assert checks["schema_version_check"]["statements"] == 1
+
+
+def test_cold_start_within_budget(database):
+    from benchmarks.cold_start import cold_start
+
+    samples = [cold_start(timeout=30.0) for _ in range(3)]
+
+    assert statistics.median(samples) * 1000 <= COLD_START_BUDGET_MS